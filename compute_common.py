@@ -0,0 +1,745 @@
+import asyncio
+import collections
+import json
+import os
+import random
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future
+import googleapiclient.errors
+
+# Helpers shared by part1, part2 and part3.
+#
+# Each part puts the top of the repo on sys.path and imports what it needs
+# from here: the lazily built compute client and its API call counter, the
+# instance spec builder, the resource cache, the operation tracker, the
+# readiness prober, the serial console follower, the instance inventory and
+# the Flask service templates the startup scripts embed.
+
+# Configuration shared by every part
+
+SERVING_TIMEOUT = 600  # Seconds to wait for a Flask endpoint to answer on port 5000
+PROBE_TIMEOUT = 5  # Seconds one readiness probe may take to connect and answer
+PROBE_MAX_DELAY = 15.0  # Longest backoff delay between probes of one target
+PROBE_CONCURRENCY = 256  # Most probe connections open at once
+SERIAL_MAX_DELAY = 10.0  # Longest backoff delay between serial console reads
+WSGI_WORKER_MEMORY_MB = 150  # Memory budget per gunicorn worker
+WSGI_THREADS = 4  # Threads per gunicorn worker
+BOOTSTRAP_NAMESPACE = "bootstrap"  # Guest attribute namespace the startup scripts publish phase timings in
+BOOTSTRAP_PHASES = ["apt-update", "apt-install", "git-clone", "pip-install", "init-db", "server-start"]
+SERVER_START_TIMEOUT = 120  # Seconds the startup script waits for Flask to answer locally
+OPERATION_TIMEOUT = 600  # Seconds to wait for an operation before giving up
+POLL_INITIAL_DELAY = 1.0  # First backoff delay between operations.get polls
+POLL_MAX_DELAY = 30.0  # Longest backoff delay between operations.get calls
+OPERATION_POLL_MAX_DELAY = 3.0  # Longest backoff between batch polls, so completions are seen within a few seconds
+BATCH_LIMIT = 1000  # Most requests the API accepts in one batch
+OPERATION_FIELDS = "name,status,error,targetLink"  # Operation fields the waiters read
+LIST_PAGE_SIZE = 500  # Instances per instances().list page
+INVENTORY_FIELDS = ("nextPageToken,items/*/instances"
+                    "(name,zone,status,labels,networkInterfaces/accessConfigs/natIP)")
+CACHE_DIR = os.path.expanduser("~/.cache/lab5-programmable-cloud")  # Local cache directory
+RESOURCE_CACHE_FILE = os.path.join(CACHE_DIR, "resources.json")  # Resolved image and snapshot selfLinks
+RESOURCE_CACHE_TTL = 3600  # Seconds a resolved selfLink is trusted
+
+# Registering Flask as a boot-time service, so it survives reboots, snapshots and images
+
+# {install_server} and {exec_start} are filled in by render_startup_script() for the serving mode
+FLASK_SERVICE_SCRIPT = """{install_server}
+cat > /etc/systemd/system/flaskr.service <<UNIT
+[Unit]
+Description=Flask tutorial (flaskr)
+After=network-online.target
+Wants=network-online.target
+
+[Service]
+WorkingDirectory=/opt/flask-app/flask-tutorial
+Environment=FLASK_APP=flaskr
+ExecStart={exec_start}
+Restart=on-failure
+StandardOutput=append:/var/log/flask.log
+StandardError=append:/var/log/flask.log
+
+[Install]
+WantedBy=multi-user.target
+UNIT
+systemctl daemon-reload
+"""
+
+# Timing each bootstrap phase on the guest and publishing it as a guest attribute,
+# so the orchestrator can read it over the API. Braces are doubled because the
+# scripts that embed this are filled in with str.format()
+
+PHASE_TIMING_SCRIPT = """GUEST_ATTRIBUTES=http://metadata.google.internal/computeMetadata/v1/instance/guest-attributes/bootstrap
+bootstrap_start=$(date +%s.%N)
+phase_start=$bootstrap_start
+end_phase() {{
+    local now=$(date +%s.%N)
+    local seconds=$(awk "BEGIN {{ printf \\"%.3f\\", $now - $phase_start }}")
+    echo "Phase $1 took $seconds seconds"
+    curl -s -X PUT --data "$seconds" -H "Metadata-Flavor: Google" "$GUEST_ATTRIBUTES/$1" || true
+    phase_start=$now
+}}
+"""
+
+# Defining the API call counter
+
+# API calls answered through the compute client, keyed by method id
+# (e.g. compute.instances.insert); batch round-trips are counted as 'batch'
+api_calls = collections.Counter()
+# Response body bytes and seconds spent parsing them, keyed by method id
+api_bytes = collections.Counter()
+api_parse_seconds = collections.Counter()
+
+def build_counted_request(http, postproc, uri, **kwargs):
+    """Build an HttpRequest that counts itself in api_calls when answered.
+
+    Used as the client's requestBuilder. Requests inside a batch are
+    answered through their postproc too, so they are counted one by one.
+    The size of each response body and the time spent parsing it are
+    added to api_bytes and api_parse_seconds.
+    """
+    from googleapiclient.http import HttpRequest
+
+    def counted_postproc(resp, content):
+        method_id = kwargs.get('methodId')
+        api_calls[method_id] += 1
+        api_bytes[method_id] += len(content or b'')
+        start = time.perf_counter()
+        try:
+            return postproc(resp, content)
+        finally:
+            api_parse_seconds[method_id] += time.perf_counter() - start
+
+    return HttpRequest(http, counted_postproc, uri, **kwargs)
+
+def print_api_report():
+    """Print how many API calls of each kind this run made."""
+    print(f"\nAPI requests:")
+    print(f"  {'Method':<40} {'Calls':>6} {'Bytes':>10} {'Parse ms':>9}")
+    for method_id, count in sorted(api_calls.items()):
+        print(f"  {method_id:<40} {count:>6} {api_bytes[method_id]:>10} "
+              f"{api_parse_seconds[method_id] * 1000:>9.2f}")
+    print(f"  {'Total':<40} {sum(api_calls.values()):>6} {sum(api_bytes.values()):>10} "
+          f"{sum(api_parse_seconds.values()) * 1000:>9.2f}")
+
+# Defining the lazily built compute client
+
+_compute = None
+
+def get_compute(get_credentials):
+    """Build the compute client on first use, with the credentials get_credentials() loads.
+
+    Every part calls this through its own get_compute(), which passes the
+    credentials that part runs with. The discovery document is the one
+    bundled with google-api-python-client, so building makes no network
+    round-trip.
+    """
+    global _compute
+    if _compute is None:
+        _compute = build_compute(get_credentials())
+    return _compute
+
+def build_compute(credentials):
+    """Build a new compute client.
+
+    A client's HTTP connection is not thread-safe, so a background thread
+    that calls the API builds its own client instead of sharing get_compute's.
+    """
+    import googleapiclient.discovery
+    return googleapiclient.discovery.build(
+        'compute', 'v1', credentials=credentials,
+        requestBuilder=build_counted_request, static_discovery=True
+    )
+
+# Defining the instance spec builder used for every insert
+def build_instance_spec(project, zone, instance_name, machine_type, source_image,
+                        tags=None, metadata=None, labels=None):
+    """Build an instances().insert body booting a new disk from source_image.
+
+    Tags, metadata and labels all go into the one insert, so the instance
+    never needs a follow-up setTags/setMetadata/setLabels call. metadata
+    maps metadata keys to values.
+    """
+    boot_disk = {
+        'boot': True,
+        'autoDelete': True,
+        'initializeParams': {'sourceImage': source_image, 'diskSizeGb': 10}
+    }
+
+    spec = {
+        'name': instance_name,
+        'machineType': f"zones/{zone}/machineTypes/{machine_type}",
+        'disks': [boot_disk],
+        'networkInterfaces': [{
+            'network': f'projects/{project}/global/networks/default',
+            'accessConfigs': [{
+                'type': 'ONE_TO_ONE_NAT',
+                'name': 'External NAT'
+            }]
+        }]
+    }
+    if tags:
+        spec['tags'] = {'items': list(tags)}
+    if metadata:
+        spec['metadata'] = {
+            'items': [{'key': key, 'value': value} for key, value in metadata.items()]
+        }
+    if labels:
+        spec['labels'] = dict(labels)
+    return spec
+
+# Defining the cache of resolved resource selfLinks
+class ResourceCache:
+    """Cache resolved resource selfLinks in memory and on disk.
+
+    Entries expire after ttl seconds and can be dropped early with
+    invalidate(). hits counts lookups answered from the cache and misses
+    counts lookups that had to call the API.
+    """
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.entries = None  # Loaded from disk on first use
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self.entries is None:
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get(self, kind, name, resolve):
+        """Return the cached value for kind/name, calling resolve() on a miss."""
+        entry = self._load().get(f"{kind}/{name}")
+        if entry and time.time() - entry['time'] < self.ttl:
+            self.hits += 1
+            return entry['value']
+        self.misses += 1
+        value = resolve()
+        self.put(kind, name, value)
+        return value
+
+    def put(self, kind, name, value):
+        """Store a value that is already known, e.g. from an operation's targetLink."""
+        self._load()[f"{kind}/{name}"] = {'value': value, 'time': time.time()}
+        self._save()
+
+    def invalidate(self, kind=None, name=None):
+        """Drop one entry, every entry of a kind, or everything."""
+        entries = self._load()
+        for key in list(entries):
+            entry_kind, entry_name = key.split('/', 1)
+            if (kind is None or kind == entry_kind) and (name is None or name == entry_name):
+                del entries[key]
+        self._save()
+
+resource_cache = ResourceCache(RESOURCE_CACHE_FILE, RESOURCE_CACHE_TTL)
+
+# Number of API calls spent waiting on each operation, keyed by operation name
+operation_polls = {}
+
+# Defining the tracker that waits on many zone and global operations at once
+class OperationTracker:
+    """Track pending zone and global operations until they are DONE.
+
+    Polls them all in one batch request per tick, or with operations.wait when only one is pending.
+    """
+
+    def __init__(self, compute, project, timeout=OPERATION_TIMEOUT):
+        self.compute = compute
+        self.project = project
+        self.timeout = timeout
+        self.pending = {}  # operation name -> (zone or None for global, future, deadline)
+        self.use_wait = True
+        self.delay = POLL_INITIAL_DELAY
+
+    def register(self, operation, zone=None, callback=None):
+        """Track an operation and return a Future for its final result.
+
+        The callback, if given, is called with the future once it resolves.
+        """
+        future = Future()
+        if callback:
+            future.add_done_callback(callback)
+        self.pending[operation] = (zone, future, time.monotonic() + self.timeout)
+        operation_polls.setdefault(operation, 0)
+        self.delay = POLL_INITIAL_DELAY
+        return future
+
+    def _request(self, method, operation, zone):
+        """Build an operations.get or operations.wait request."""
+        if zone:
+            return getattr(self.compute.zoneOperations(), method)(
+                project=self.project, zone=zone, operation=operation,
+                fields=OPERATION_FIELDS
+            )
+        return getattr(self.compute.globalOperations(), method)(
+            project=self.project, operation=operation, fields=OPERATION_FIELDS
+        )
+
+    def _resolve(self, operation, result=None, exception=None):
+        """Resolve the future of an operation that is DONE or failed."""
+        if exception is None and result['status'] != 'DONE':
+            return False
+        zone, future, deadline = self.pending.pop(operation)
+        if exception is None and 'error' in result:
+            exception = Exception(result['error'])
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+        return True
+
+    def _on_batch_response(self, operation, response, exception):
+        self._resolve(operation, response, exception)
+
+    def tick(self):
+        """Poll every pending operation once and back off if none finished."""
+        if not self.pending:
+            return
+        finished = len(self.pending)
+
+        if len(self.pending) == 1 and self.use_wait:
+            operation, (zone, future, deadline) = next(iter(self.pending.items()))
+            operation_polls[operation] += 1
+            try:
+                result = self._request('wait', operation, zone).execute()
+            except googleapiclient.errors.HttpError as e:
+                print(f"  operations.wait failed ({e.resp.status}), falling back to polling")
+                self.use_wait = False
+                return
+            self._resolve(operation, result)
+        else:
+            names = list(self.pending)
+            for i in range(0, len(names), BATCH_LIMIT):
+                batch = self.compute.new_batch_http_request(callback=self._on_batch_response)
+                for operation in names[i:i + BATCH_LIMIT]:
+                    operation_polls[operation] += 1
+                    batch.add(self._request('get', operation, self.pending[operation][0]),
+                              request_id=operation)
+                batch.execute()
+                api_calls['batch'] += 1
+
+        now = time.monotonic()
+        for operation, (zone, future, deadline) in list(self.pending.items()):
+            if now > deadline:
+                self._resolve(operation, exception=TimeoutError(
+                    f"Operation {operation} not done after {self.timeout} seconds"))
+
+        if len(self.pending) < finished:
+            self.delay = POLL_INITIAL_DELAY
+        elif self.pending and not (len(self.pending) == 1 and self.use_wait):
+            time.sleep(self.delay / 2 + random.uniform(0, self.delay / 2))
+            self.delay = min(self.delay * 2, OPERATION_POLL_MAX_DELAY)
+
+    def wait(self, futures=None):
+        """Tick until the given futures (by default, everything pending) resolve."""
+        if futures is None:
+            futures = [future for zone, future, deadline in self.pending.values()]
+        while not all(future.done() for future in futures):
+            self.tick()
+        return [future.result() for future in futures]
+
+# Defining the wait_for_operation for the zone operation
+def wait_for_operation(compute, project, zone, operation, timeout=OPERATION_TIMEOUT):
+    """Wait for a zone operation to complete."""
+    print(f"  Waiting for operation to complete...")
+    tracker = OperationTracker(compute, project, timeout)
+    result, = tracker.wait([tracker.register(operation, zone)])
+    print(f"  Operation completed ({operation_polls[operation]} API calls)")
+    return result
+
+# Defining the wait_for_global_operation for completing the global operation
+def wait_for_global_operation(compute, project, operation, timeout=OPERATION_TIMEOUT):
+    """Wait for a global operation to complete."""
+    print(f"  Waiting for operation to complete...")
+    tracker = OperationTracker(compute, project, timeout)
+    result, = tracker.wait([tracker.register(operation)])
+    print(f"  Operation completed ({operation_polls[operation]} API calls)")
+    return result
+
+# Defining the readiness prober for the Flask endpoints
+async def probe_target(name, url, deadline, slots, on_ready=None):
+    """Probe one URL with backoff until it answers HTTP 200 and return when it did.
+
+    Returns the time.perf_counter() reading at the first HTTP 200, or None
+    if the deadline passed first.
+    """
+    target = urllib.parse.urlsplit(url)
+    loop = asyncio.get_running_loop()
+    delay = POLL_INITIAL_DELAY
+    while loop.time() < deadline:
+        try:
+            async with slots:
+                reader, writer = await asyncio.wait_for(
+                    asyncio.open_connection(target.hostname, target.port or 80), PROBE_TIMEOUT
+                )
+                try:
+                    writer.write(f"GET {target.path or '/'} HTTP/1.0\r\n"
+                                 f"Host: {target.netloc}\r\n\r\n".encode())
+                    await writer.drain()
+                    status_line = await asyncio.wait_for(reader.readline(), PROBE_TIMEOUT)
+                finally:
+                    writer.close()
+            if status_line.split()[1:2] == [b'200']:
+                ready = time.perf_counter()
+                if on_ready:
+                    on_ready(name, ready)
+                return ready
+        except (OSError, asyncio.TimeoutError):
+            pass
+        await asyncio.sleep(min(delay / 2 + random.uniform(0, delay / 2),
+                                max(0, deadline - loop.time())))
+        delay = min(delay * 2, PROBE_MAX_DELAY)
+    return None
+
+async def probe_all(urls, timeout, on_ready=None):
+    """Probe every URL concurrently until all are ready or the deadline passes."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    slots = asyncio.Semaphore(PROBE_CONCURRENCY)
+    ready = await asyncio.gather(*(
+        probe_target(name, url, deadline, slots, on_ready) for name, url in urls.items()
+    ))
+    return dict(zip(urls, ready))
+
+def wait_until_ready(urls, timeout=SERVING_TIMEOUT, on_ready=None):
+    """Probe every URL on one event loop and return when each first answered HTTP 200.
+
+    urls maps a name to a URL such as http://IP:5000. Each target backs off
+    on its own, with jitter, and all of them share one deadline, so this
+    returns as soon as the last target is ready. on_ready(name, ready) is
+    called the moment a target is. Targets that never answer map to None.
+    """
+    return asyncio.run(probe_all(urls, timeout, on_ready))
+
+# Defining the prober that starts on each URL as soon as it is known
+class ReadinessProber:
+    """Probe URLs on a background event loop, each from the moment it is added.
+
+    on_ready(name, ready) is called on the prober's thread when a target answers HTTP 200.
+    """
+
+    def __init__(self, timeout=SERVING_TIMEOUT, on_ready=None):
+        self.timeout = timeout
+        self.on_ready = on_ready
+        self.slots = None
+        self.probes = {}
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    async def _probe(self, name, url):
+        if self.slots is None:
+            self.slots = asyncio.Semaphore(PROBE_CONCURRENCY)
+        deadline = self.loop.time() + self.timeout
+        return await probe_target(name, url, deadline, self.slots, self.on_ready)
+
+    def add(self, name, url):
+        """Start probing url now."""
+        self.probes[name] = asyncio.run_coroutine_threadsafe(self._probe(name, url), self.loop)
+
+    def wait(self):
+        """Wait for every probe and return when each URL first answered HTTP 200, or None."""
+        ready = {name: probe.result() for name, probe in self.probes.items()}
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        return ready
+
+# Defining the serial console follower that replaces ssh and tail -f
+class SerialLogFollower:
+    """Stream the serial console output of many instances, one batch request per tick.
+
+    Passes new lines to on_line(name, line) and records in seen when each marker first appears.
+    """
+
+    def __init__(self, compute, project, zone, on_line=None, sleep=None):
+        self.compute = compute
+        self.project = project
+        self.zone = zone
+        self.on_line = on_line or (lambda name, line: print(f"  [{name}] {line}"))
+        self.offsets = {}
+        self.partial = {}
+        self.markers = {}  # instance name -> markers not seen yet
+        self.seen = {}  # instance name -> {marker: time.time() first seen}
+        self.delay = POLL_INITIAL_DELAY
+        self.new_bytes = 0
+        self.sleep = sleep
+
+    def follow(self, instance_name, markers=()):
+        """Start following an instance until all of markers appear in its output."""
+        self.offsets.setdefault(instance_name, 0)
+        self.partial.setdefault(instance_name, '')
+        self.markers[instance_name] = set(markers)
+        self.seen.setdefault(instance_name, {})
+
+    @property
+    def pending(self):
+        """Names of the instances still waiting for a marker."""
+        return [name for name, markers in self.markers.items() if markers]
+
+    def _on_response(self, instance_name, response, exception):
+        if exception is not None:
+            # The instance may not exist or have a console yet
+            if isinstance(exception, googleapiclient.errors.HttpError) and exception.resp.status in (400, 404):
+                return
+            raise exception
+        offset = self.offsets[instance_name]
+        start = int(response.get('start', offset))
+        if start > offset:
+            self.on_line(instance_name, f"... {start - offset} bytes dropped from the console buffer ...")
+        contents = response.get('contents', '')
+        self.offsets[instance_name] = int(response.get('next', offset))
+        self.new_bytes += len(contents)
+
+        *lines, self.partial[instance_name] = (self.partial[instance_name] + contents).split('\n')
+        for line in lines:
+            line = line.rstrip('\r')
+            self.on_line(instance_name, line)
+            for marker in list(self.markers[instance_name]):
+                if marker in line:
+                    self.seen[instance_name][marker] = time.time()
+                    self.markers[instance_name].discard(marker)
+
+    def tick(self):
+        """Fetch the new output of every pending instance once."""
+        names = self.pending
+        self.new_bytes = 0
+        for i in range(0, len(names), BATCH_LIMIT):
+            batch = self.compute.new_batch_http_request(callback=self._on_response)
+            for instance_name in names[i:i + BATCH_LIMIT]:
+                batch.add(self.compute.instances().getSerialPortOutput(
+                    project=self.project,
+                    zone=self.zone,
+                    instance=instance_name,
+                    start=self.offsets[instance_name],
+                    fields='contents,start,next'
+                ), request_id=instance_name)
+            batch.execute()
+            api_calls['batch'] += 1
+
+        if self.new_bytes:
+            self.delay = POLL_INITIAL_DELAY
+        elif self.pending:
+            (self.sleep or time.sleep)(self.delay / 2 + random.uniform(0, self.delay / 2))
+            self.delay = min(self.delay * 2, SERIAL_MAX_DELAY)
+
+    def wait(self, timeout):
+        """Tick until every marker has appeared or timeout seconds pass, and return seen."""
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            self.tick()
+        return self.seen
+
+# Defining list of instances which are deployed
+def list_instances(compute, project, zone, instance_filter=None,
+                   max_results=LIST_PAGE_SIZE, fields='items(name,status)'):
+    """Yield the instances in a zone, one page at a time.
+
+    Follows nextPageToken so zones with more than one page of instances
+    are listed completely, while only the current page is held in memory.
+    instance_filter and fields are applied by the server.
+    """
+    request = compute.instances().list(
+        project=project,
+        zone=zone,
+        filter=instance_filter,
+        maxResults=max_results,
+        fields=f"nextPageToken,{fields}"
+    )
+    while request is not None:
+        response = request.execute()
+        yield from response.get('items', [])
+        request = compute.instances().list_next(request, response)
+
+# Defining the fleet-wide instance inventory
+class InstanceInventory:
+    """Index of every instance in the project, built from aggregatedList.
+
+    One paginated aggregatedList scan covers every zone. Each instance is
+    kept as a small record (name, zone, status, labels, ip) and indexed by
+    name, zone, label and status, so lookups that would otherwise need an
+    instances().get per instance are answered from memory.
+    """
+
+    def __init__(self):
+        self.by_name = collections.defaultdict(list)
+        self.by_zone = collections.defaultdict(list)
+        self.by_status = collections.defaultdict(list)
+        self.by_label = collections.defaultdict(list)  # (key, value) -> records
+
+    @classmethod
+    def scan(cls, compute, project, instance_filter=None, max_results=LIST_PAGE_SIZE):
+        """Build an inventory from aggregatedList, following every page."""
+        inventory = cls()
+        request = compute.instances().aggregatedList(
+            project=project,
+            filter=instance_filter,
+            maxResults=max_results,
+            fields=INVENTORY_FIELDS
+        )
+        while request is not None:
+            response = request.execute()
+            for scope in response.get('items', {}).values():
+                for instance in scope.get('instances', []):
+                    inventory.add(instance)
+            request = compute.instances().aggregatedList_next(request, response)
+        return inventory
+
+    def add(self, instance):
+        """Index one instance resource."""
+        ip = None
+        for interface in instance.get('networkInterfaces', []):
+            for access_config in interface.get('accessConfigs', []):
+                ip = ip or access_config.get('natIP')
+        record = {
+            'name': instance['name'],
+            'zone': instance['zone'].split('/')[-1],
+            'status': instance.get('status'),
+            'labels': instance.get('labels', {}),
+            'ip': ip
+        }
+        self.by_name[record['name']].append(record)
+        self.by_zone[record['zone']].append(record)
+        self.by_status[record['status']].append(record)
+        for label in record['labels'].items():
+            self.by_label[label].append(record)
+        return record
+
+    def get(self, name, zone=None):
+        """Return the record for an instance name, or None if there is none."""
+        for record in self.by_name.get(name, []):
+            if zone is None or record['zone'] == zone:
+                return record
+        return None
+
+    def find(self, zone=None, status=None, label=None):
+        """Return the records matching every given zone, status and (key, value) label."""
+        candidates = [
+            set(id(record) for record in index.get(key, []))
+            for index, key in ((self.by_zone, zone), (self.by_status, status),
+                               (self.by_label, label))
+            if key is not None
+        ]
+        return [
+            record for records in self.by_name.values() for record in records
+            if all(id(record) in ids for ids in candidates)
+        ]
+
+    def __len__(self):
+        return sum(len(records) for records in self.by_name.values())
+
+# Printing the inventory for the --inventory command
+def print_inventory(inventory, zone=None, status=None, label=None):
+    """Print the instances in the inventory that match the given queries."""
+    records = inventory.find(zone=zone, status=status, label=label)
+    print(f"\nInventory: {len(records)} of {len(inventory)} instances")
+    print(f"{'Name':<30} {'Zone':<16} {'Status':<12} {'External IP':<16} Labels")
+    print("-" * 90)
+    for record in sorted(records, key=lambda r: (r['zone'], r['name'])):
+        labels = ','.join(f"{k}={v}" for k, v in sorted(record['labels'].items()))
+        print(f"{record['name']:<30} {record['zone']:<16} {record['status']:<12} "
+              f"{record['ip'] or '-':<16} {labels}")
+
+# Checking whether an instance exists
+def instance_exists(compute, project, zone, instance_name):
+    """Check if an instance exists."""
+    try:
+        compute.instances().get(
+            project=project,
+            zone=zone,
+            instance=instance_name,
+            fields='name'
+        ).execute()
+        return True
+    except googleapiclient.errors.HttpError as e:
+        if e.resp.status != 404:
+            raise
+        return False
+
+# Getting image from family
+def get_image_from_family(compute, image_project, family):
+    """Get the latest image from a family, cached for RESOURCE_CACHE_TTL."""
+    return resource_cache.get(
+        'images', f"{image_project}/{family}",
+        lambda: compute.images().getFromFamily(
+            project=image_project,
+            family=family,
+            fields='selfLink'
+        ).execute()['selfLink']
+    )
+
+# Sizing the WSGI server for the machine type
+def wsgi_workers(cpus, memory_mb):
+    """Return (workers, threads) for gunicorn on a machine with cpus and memory_mb.
+
+    Starts from the usual 2 * vCPUs + 1 workers and caps it by how many
+    WSGI_WORKER_MEMORY_MB workers fit in the machine's memory, so shared-core
+    types like f1-micro are not pushed into swap. Each worker runs
+    WSGI_THREADS threads to overlap requests waiting on I/O.
+    """
+    return max(1, min(2 * cpus + 1, memory_mb // WSGI_WORKER_MEMORY_MB)), WSGI_THREADS
+
+def wsgi_sizing(compute, project, zone, machine_type):
+    """Return (workers, threads) for gunicorn on a machine type, see wsgi_workers()."""
+    spec = resource_cache.get(
+        'machineTypes', f"{zone}/{machine_type}",
+        lambda: compute.machineTypes().get(
+            project=project,
+            zone=zone,
+            machineType=machine_type,
+            fields='guestCpus,memoryMb'
+        ).execute()
+    )
+    return wsgi_workers(spec['guestCpus'], spec['memoryMb'])
+
+def render_startup_script(script, serving_mode, workers=1, threads=1):
+    """Fill in how flaskr.service runs the app in a script that embeds FLASK_SERVICE_SCRIPT."""
+    if serving_mode == 'wsgi':
+        return script.format(
+            install_server="pip3 install gunicorn",
+            exec_start=(f"$(command -v gunicorn) --workers {workers} --threads {threads} "
+                        f"--bind 0.0.0.0:5000 'flaskr:create_app()'")
+        )
+    return script.format(install_server="", exec_start="$(command -v flask) run -h 0.0.0.0")
+
+# Harvesting the bootstrap phase timings the startup scripts publish as guest attributes
+def parse_bootstrap_phases(response):
+    """Return {phase: seconds} from a getGuestAttributes response."""
+    return {
+        item['key']: float(item['value'])
+        for item in response.get('queryValue', {}).get('items', [])
+    }
+
+def get_guest_attributes(compute, project, zone, instance_name, namespace):
+    """Return the getGuestAttributes response for a namespace, or {} if nothing is published."""
+    try:
+        return compute.instances().getGuestAttributes(
+            project=project,
+            zone=zone,
+            instance=instance_name,
+            queryPath=f"{namespace}/"
+        ).execute()
+    except googleapiclient.errors.HttpError as e:
+        # Nothing has been published yet
+        if e.resp.status == 404:
+            return {}
+        raise
+
+def get_bootstrap_phases(compute, project, zone, instance_name, namespace=BOOTSTRAP_NAMESPACE):
+    """Return the timings an instance has published in a guest attribute namespace so far."""
+    return parse_bootstrap_phases(get_guest_attributes(compute, project, zone, instance_name, namespace))
+
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import time
+import urllib.parse
+import urllib.request
+
+# Gunicorn is sized with the same formula as on the VMs, from compute_common.py
+from compute_common import wsgi_workers
+
+# Compares the throughput of flaskr under the flask development server and
+# under gunicorn.
+#
+# With --app-dir pointing at a local checkout of the flask tutorial (with
+# flask, gunicorn and the app installed), each server is started on a
+# local port, loaded for --duration seconds by --concurrency clients on one
+# event loop, and stopped again. With --url, an already running server,
+# such as a VM started by part1, is loaded instead. Every request opens a
+# new connection, like the browsers and probes that hit the VMs do.
+
+PORT = 5050
+CONCURRENCY = 32  # Clients sending requests back to back
+DURATION = 10  # Seconds each server is loaded
+WARMUP = 2  # Seconds of load before measuring
+REQUEST_TIMEOUT = 10  # Seconds one request may take
+
+def local_wsgi_sizing():
+    """Return (workers, threads) for this machine, sized as the VMs are."""
+    memory_mb = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    return wsgi_workers(os.cpu_count() or 1, memory_mb)
+
+def server_commands(port):
+    """Return the command that starts each serving mode on port."""
+    workers, threads = local_wsgi_sizing()
+    return {
+        'dev': ['flask', 'run', '-h', '127.0.0.1', '-p', str(port)],
+        'wsgi': ['gunicorn', '--workers', str(workers), '--threads', str(threads),
+                 '--bind', f"127.0.0.1:{port}", 'flaskr:create_app()'],
+    }
+
+def wait_for_server(url, timeout=30):
+    """Wait until url answers, so startup time is not counted as load."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f"{url} did not answer within {timeout} seconds")
+
+async def request_once(host, port, path):
+    """Send one GET and return True on HTTP 200."""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), REQUEST_TIMEOUT)
+    try:
+        writer.write(f"GET {path} HTTP/1.0\r\nHost: {host}\r\n\r\n".encode())
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), REQUEST_TIMEOUT)
+        await asyncio.wait_for(reader.read(), REQUEST_TIMEOUT)
+    finally:
+        writer.close()
+    return status_line.split()[1:2] == [b'200']
+
+async def client(host, port, path, measure_from, stop_at, latencies, errors):
+    """Send requests back to back until stop_at, recording those after measure_from."""
+    loop = asyncio.get_running_loop()
+    while loop.time() < stop_at:
+        start = loop.time()
+        try:
+            ok = await request_once(host, port, path)
+        except (OSError, asyncio.TimeoutError):
+            ok = False
+        if start >= measure_from:
+            if ok:
+                latencies.append(loop.time() - start)
+            else:
+                errors.append(start)
+
+async def load(url, concurrency, duration, warmup):
+    """Load url with concurrency clients and return the latencies and error count."""
+    target = urllib.parse.urlsplit(url)
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    stop_at = measure_from + duration
+    latencies, errors = [], []
+    await asyncio.gather(*(
+        client(target.hostname, target.port or 80, target.path or '/',
+               measure_from, stop_at, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    return latencies, len(errors)
+
+def summarize(latencies, errors, duration):
+    """Return the throughput and latency summary of one run."""
+    ordered = sorted(latencies)
+    return {
+        'requests_per_second': len(latencies) / duration,
+        'p50_ms': statistics.median(ordered) * 1000 if ordered else None,
+        'p99_ms': ordered[int(0.99 * (len(ordered) - 1))] * 1000 if ordered else None,
+        'errors': errors,
+    }
+
+def run_local(mode, command, app_dir, port, args):
+    """Start one serving mode from app_dir, load it, and stop it."""
+    env = dict(os.environ, FLASK_APP='flaskr')
+    server = subprocess.Popen(command, cwd=app_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        url = f"http://127.0.0.1:{port}/"
+        wait_for_server(url)
+        print(f"  Loading {mode}: {' '.join(command)}")
+        latencies, errors = asyncio.run(load(url, args.concurrency, args.duration, args.warmup))
+        return summarize(latencies, errors, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test flaskr under the dev server and gunicorn")
+    parser.add_argument('--app-dir', help="local flask-tutorial checkout to serve from")
+    parser.add_argument('--url', help="load an already running server instead, e.g. http://IP:5000/")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY,
+                        help="clients sending requests back to back")
+    parser.add_argument('--duration', type=float, default=DURATION,
+                        help="seconds of measured load per server")
+    parser.add_argument('--warmup', type=float, default=WARMUP,
+                        help="seconds of load before measuring")
+    parser.add_argument('--port', type=int, default=PORT,
+                        help="local port for --app-dir servers")
+    args = parser.parse_args()
+    if not args.app_dir and not args.url:
+        parser.error("give --app-dir to compare local servers or --url to load a running one")
+
+    results = {}
+    if args.url:
+        latencies, errors = asyncio.run(load(args.url, args.concurrency, args.duration, args.warmup))
+        results[args.url] = summarize(latencies, errors, args.duration)
+    else:
+        for mode, command in server_commands(args.port).items():
+            results[mode] = run_local(mode, command, args.app_dir, args.port, args)
+
+    print(f"\n{'Server':<30} {'req/s':>10} {'p50 (ms)':>10} {'p99 (ms)':>10} {'errors':>8}")
+    print("-" * 72)
+    for name, result in results.items():
+        p50 = f"{result['p50_ms']:.1f}" if result['p50_ms'] is not None else "-"
+        p99 = f"{result['p99_ms']:.1f}" if result['p99_ms'] is not None else "-"
+        print(f"{name:<30} {result['requests_per_second']:>10.1f} {p50:>10} {p99:>10} {result['errors']:>8}")
+    if 'dev' in results and results['dev']['requests_per_second']:
+        print(f"\ngunicorn throughput: "
+              f"{results['wsgi']['requests_per_second'] / results['dev']['requests_per_second']:.1f}x "
+              f"the development server")
+    print(f"\n{args.concurrency} clients, {args.duration:.0f} s measured after {args.warmup:.0f} s warm-up.")
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,31 @@
 #!/usr/bin/env python3
 
+import argparse
+import json
+import os
+import random
 import time
 import sys
-import googleapiclient.discovery
+import googleapiclient.errors
 import google.auth
 
+# The helpers shared by all three parts live in compute_common.py at the top of the repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compute_common
+from compute_common import (
+    SERVING_TIMEOUT, BOOTSTRAP_NAMESPACE, BOOTSTRAP_PHASES, SERVER_START_TIMEOUT,
+    OPERATION_TIMEOUT, POLL_INITIAL_DELAY, POLL_MAX_DELAY, BATCH_LIMIT,
+    FLASK_SERVICE_SCRIPT, PHASE_TIMING_SCRIPT, api_calls, print_api_report,
+    build_instance_spec, resource_cache, operation_polls, OperationTracker,
+    wait_for_operation, wait_for_global_operation, wait_until_ready, SerialLogFollower,
+    list_instances, InstanceInventory, print_inventory, get_image_from_family,
+    wsgi_sizing, render_startup_script, parse_bootstrap_phases, get_bootstrap_phases
+)
+
 # Configuration of the project
 
-# Get credentials and set project ID
-credentials, _ = google.auth.default()
+# Set project ID, the compute client is built on first use by get_compute()
 PROJECT_ID = "lab5cloud-474120"  # Inserting the project id
-compute = googleapiclient.discovery.build('compute', 'v1', credentials=credentials) # Computing the required credentials
 
 ZONE = "us-west1-b" # defining the zone 
 INSTANCE_NAME = "flask-tutorial-vm" #Defining instance name
@@ -19,14 +34,23 @@ IMAGE_FAMILY = "ubuntu-2204-lts" # Defining the image family
 IMAGE_PROJECT = "ubuntu-os-cloud" 
 NETWORK_TAG = "allow-5000" # defining firewall 
 FIREWALL_RULE_NAME = "allow-5000"
+INSTANCE_LABELS = {'app': 'flask-tutorial', 'part': 'part1'}
+SERVING_MODE = "wsgi"  # "wsgi" runs gunicorn sized to MACHINE_TYPE, "dev" the flask run development server
+INSTALL_MARKER = "Installation Complete"  # Startup script line that ends the install
+GOLDEN_IMAGE_FAMILY = "flask-tutorial-golden"  # Image family the bake stage publishes to
+BAKE_INSTANCE_NAME = f"{INSTANCE_NAME}-bake"  # Temporary VM the install is baked on
+BAKE_MARKER = "Bake Complete"  # Bake script line once the install is done
+BAKE_TIMEOUT = 1800  # Seconds the install may take on the bake VM
+START_MARKER = "Start Complete"  # Start script line once Flask is launched from the golden image
+GOLDEN_RESULTS_FILE = "golden_results.json"  # Results of the golden image benchmark
 
 # Setting upo the startup script 
 
-STARTUP_SCRIPT = """#!/bin/bash
+STARTUP_SCRIPT = f"""#!/bin/bash
 set -e
 exec > >(tee -a /var/log/startup-script.log)
 exec 2>&1
-
+{PHASE_TIMING_SCRIPT}
 echo "=== Flask Tutorial Installation Started at $(date) ==="
 
 # Create working directory
@@ -36,81 +60,157 @@ cd /opt/flask-app
 # Update and install dependencies
 echo "Installing dependencies..."
 apt-get update
+end_phase apt-update
 apt-get install -y python3 python3-pip git
+end_phase apt-install
 
 # Clone Flask tutorial
 echo "Cloning Flask tutorial repository..."
 git clone https://github.com/cu-csci-4253-datacenter/flask-tutorial
+end_phase git-clone
 cd flask-tutorial
 
 # Install Flask tutorial
 echo "Installing Flask application..."
 python3 setup.py install
 pip3 install -e .
+end_phase pip-install
 
 # Setup and run Flask
 export FLASK_APP=flaskr
 echo "Initializing database..."
 flask init-db
+end_phase init-db
 
 echo "Starting Flask application..."
-nohup flask run -h 0.0.0.0 > /var/log/flask.log 2>&1 &
+{FLASK_SERVICE_SCRIPT}systemctl enable --now flaskr.service
+timeout {SERVER_START_TIMEOUT} bash -c 'until curl -s -o /dev/null http://localhost:5000/; do sleep 0.5; done' || true
+end_phase server-start
+phase_start=$bootstrap_start
+end_phase total
 
 echo "=== Flask Tutorial Installation Complete at $(date) ==="
 echo "Flask is running on port 5000"
 """
 
-#  Defining the helper functions
+# Setting up the bake script, which installs once and powers off so the disk can become an image
 
-# Defining the wait function to process the operation in the loop
-def wait_for_operation(compute, project, zone, operation):
-    """Wait for a zone operation to complete."""
-    print(f"  Waiting for operation to complete...")
-    while True:
-        result = compute.zoneOperations().get(
-            project=project,
-            zone=zone,
-            operation=operation
-        ).execute()
+BAKE_SCRIPT = f"""#!/bin/bash
+set -e
+exec > >(tee -a /var/log/bake.log)
+exec 2>&1
+{PHASE_TIMING_SCRIPT}
+echo "=== Flask Tutorial Bake Started at $(date) ==="
 
-        if result['status'] == 'DONE':
-            if 'error' in result:
-                raise Exception(result['error'])
-            print(f"  Operation completed")
-            return result
-        time.sleep(1)
-
-#  Defining loop to execute the golbal operation
-def wait_for_global_operation(compute, project, operation):
-    """Wait for a global operation to complete."""
-    print(f"  Waiting for operation to complete...")
-    while True:
-        result = compute.globalOperations().get(
-            project=project,
-            operation=operation
-        ).execute()
+mkdir -p /opt/flask-app
+cd /opt/flask-app
 
-        if result['status'] == 'DONE':
-            if 'error' in result:
-                raise Exception(result['error'])
-            print(f"  Operation completed")
-            return result
-        time.sleep(1)
+apt-get update
+end_phase apt-update
+apt-get install -y python3 python3-pip git
+end_phase apt-install
+
+git clone https://github.com/cu-csci-4253-datacenter/flask-tutorial
+end_phase git-clone
+cd flask-tutorial
+
+python3 setup.py install
+pip3 install -e .
+end_phase pip-install
+
+export FLASK_APP=flaskr
+flask init-db
+end_phase init-db
+
+# Enabled but not started, it starts on every boot of the image
+{FLASK_SERVICE_SCRIPT}systemctl enable flaskr.service
+
+# Keep the image small
+apt-get clean
+phase_start=$bootstrap_start
+end_phase total
+
+echo "=== Flask Tutorial Bake Complete at $(date) ==="
+poweroff
+"""
+
+# Setting up the start step for VMs booted from the golden image
+
+START_SCRIPT = """#!/bin/bash
+# flaskr.service is enabled in the image and normally already started
+systemctl start flaskr.service
+echo "=== Flask Tutorial Start Complete at $(date) ==="
+"""
+
+#  Defining the helper functions
+
+# Defining the lazily built compute client
+def get_credentials():
+    """Load the application default credentials."""
+    credentials, _ = google.auth.default()
+    return credentials
+
+def get_compute():
+    """Build the compute client on first use."""
+    return compute_common.get_compute(get_credentials)
 
 # Defining loop for executing to check whether a firewall rule is defined or not
 def firewall_rule_exists(compute, project, rule_name):
     """Check if a firewall rule exists."""
     try:
-        compute.firewalls().get(project=project, firewall=rule_name).execute()
+        compute.firewalls().get(project=project, firewall=rule_name, fields='name').execute()
         return True
     except:
         return False
 
-# Defining list of instances which are deployed
-def list_instances(compute, project, zone):
-    """List all instances in a zone."""
-    result = compute.instances().list(project=project, zone=zone).execute()
-    return result['items'] if 'items' in result else None
+# Harvesting the bootstrap phase timings the startup scripts publish as guest attributes
+def harvest_bootstrap_phases(compute, project, records):
+    """Fetch the phase timings of every inventory record, one batch request per BATCH_LIMIT."""
+    phases = {}
+
+    def on_response(request_id, response, exception):
+        if exception is None:
+            phases[request_id] = parse_bootstrap_phases(response)
+        elif not (isinstance(exception, googleapiclient.errors.HttpError) and exception.resp.status == 404):
+            raise exception
+
+    for i in range(0, len(records), BATCH_LIMIT):
+        batch = compute.new_batch_http_request(callback=on_response)
+        for record in records[i:i + BATCH_LIMIT]:
+            batch.add(compute.instances().getGuestAttributes(
+                project=project,
+                zone=record['zone'],
+                instance=record['name'],
+                queryPath=f"{BOOTSTRAP_NAMESPACE}/"
+            ), request_id=record['name'])
+        batch.execute()
+        api_calls['batch'] += 1
+    return phases
+
+def print_bootstrap_report(phases):
+    """Print each instance's phase timings and the fleet-wide mean, p50 and max of each phase."""
+    print(f"\nBootstrap phases (seconds), {len(phases)} instances reporting")
+    print(f"{'Instance':<30}" + "".join(f"{phase:>13}" for phase in BOOTSTRAP_PHASES) + f"{'total':>10}")
+    for name, timings in sorted(phases.items()):
+        print(f"{name:<30}" + "".join(
+            f"{timings[phase]:>13.1f}" if phase in timings else f"{'-':>13}" for phase in BOOTSTRAP_PHASES
+        ) + (f"{timings['total']:>10.1f}" if 'total' in timings else f"{'-':>10}"))
+
+    samples = {
+        phase: sorted(timings[phase] for timings in phases.values() if phase in timings)
+        for phase in BOOTSTRAP_PHASES
+    }
+    samples = {phase: values for phase, values in samples.items() if values}
+    if not samples:
+        return
+    means = {phase: sum(values) / len(values) for phase, values in samples.items()}
+    total = sum(means.values())
+    print(f"\n{'Phase':<14} {'n':>4} {'mean':>8} {'p50':>8} {'max':>8} {'share':>7}")
+    for phase in sorted(means, key=means.get, reverse=True):
+        values = samples[phase]
+        print(f"{phase:<14} {len(values):>4} {means[phase]:>8.1f} {values[len(values) // 2]:>8.1f} "
+              f"{values[-1]:>8.1f} {means[phase] / total:>7.0%}")
+    print(f"\nSlowest phase: {max(means, key=means.get)}")
 
 # MAIN FUNCTIONS
 
@@ -146,68 +246,25 @@ def create_firewall_rule(compute, project, rule_name, network_tag):
     wait_for_global_operation(compute, project, operation['name'])
     print(f"  Firewall rule created")
 
-# Getting image from mthe family 
-def get_image_from_family(compute, image_project, family):
-    """Get the latest image from a family."""
-    image_response = compute.images().getFromFamily(
-        project=image_project,
-        family=family
-    ).execute()
-    return image_response['selfLink']
-
 # Creating VM instances
 def create_instance(compute, project, zone, instance_name, machine_type, 
-                   image_project, image_family, startup_script):
+                   image_project, image_family, startup_script, network_tag):
     """Create VM instance."""
     print(f"\nStep 2: Creating VM instance '{instance_name}'...")
     
     # Get latest image
-    print(f"  Fetching Ubuntu 22.04 LTS image...")
+    print(f"  Fetching the latest {image_family} image...")
     source_disk_image = get_image_from_family(compute, image_project, image_family)
     print(f"  Image retrieved")
     
-    # Configuring instance
-    machine_type_url = f"zones/{zone}/machineTypes/{machine_type}"
-    
-    config = {
-        'name': instance_name,
-        'machineType': machine_type_url,
-        
-        # Booting disk
-        'disks': [
-            {
-                'boot': True,
-                'autoDelete': True,
-                'initializeParams': {
-                    'sourceImage': source_disk_image,
-                    'diskSizeGb': 10
-                }
-            }
-        ],
-        
-        # Setting up Network interface with external IP
-        'networkInterfaces': [
-            {
-                'network': f'projects/{project}/global/networks/default',
-                'accessConfigs': [
-                    {
-                        'type': 'ONE_TO_ONE_NAT',
-                        'name': 'External NAT'
-                    }
-                ]
-            }
-        ],
-        
-        # Startup script
-        'metadata': {
-            'items': [
-                {
-                    'key': 'startup-script',
-                    'value': startup_script
-                }
-            ]
-        }
-    }
+    # Configuring instance, the network tag goes in the insert so no setTags call is needed
+    config = build_instance_spec(
+        project, zone, instance_name, machine_type,
+        source_image=source_disk_image,
+        tags=[network_tag],
+        metadata={'startup-script': startup_script, 'enable-guest-attributes': 'TRUE'},
+        labels=INSTANCE_LABELS
+    )
     
     operation = compute.instances().insert(
         project=project,
@@ -218,46 +275,19 @@ def create_instance(compute, project, zone, instance_name, machine_type,
     wait_for_operation(compute, project, zone, operation['name'])
     print(f"  Instance created")
 
-# Applying a network tag to the instance
-def apply_network_tag(compute, project, zone, instance_name, network_tag):
-    """Apply network tag to instance."""
-    print(f"\nStep 3: Applying network tag '{network_tag}'...")
-    
-    # Get instance to retrieve fingerprint
-    instance = compute.instances().get(
-        project=project,
-        zone=zone,
-        instance=instance_name
-    ).execute()
-    
-    # Set tags
-    tags_body = {
-        'items': [network_tag],
-        'fingerprint': instance['tags']['fingerprint']
-    }
-    
-    operation = compute.instances().setTags(
-        project=project,
-        zone=zone,
-        instance=instance_name,
-        body=tags_body
-    ).execute()
-    
-    wait_for_operation(compute, project, zone, operation['name'])
-    print(f"  Network tag applied")
-
 # getting external ip for the isntance
 def get_external_ip(compute, project, zone, instance_name):
     """Get external IP of instance."""
-    print(f"\nStep 4: Retrieving external IP address...")
+    print(f"\nStep 3: Retrieving external IP address...")
     
     instance = compute.instances().get(
         project=project,
         zone=zone,
-        instance=instance_name
+        instance=instance_name,
+        fields='networkInterfaces/accessConfigs/natIP'
     ).execute()
     
-    for interface in instance['networkInterfaces']:
+    for interface in instance.get('networkInterfaces', []):
         if 'accessConfigs' in interface:
             for access_config in interface['accessConfigs']:
                 if 'natIP' in access_config:
@@ -266,10 +296,184 @@ def get_external_ip(compute, project, zone, instance_name):
                     return external_ip
     return None
 
+# GOLDEN IMAGE
+
+def wait_for_status(compute, project, zone, instance_name, status, timeout=OPERATION_TIMEOUT):
+    """Poll an instance with backoff until it reaches status."""
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
+    while compute.instances().get(
+        project=project,
+        zone=zone,
+        instance=instance_name,
+        fields='status'
+    ).execute()['status'] != status:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Instance {instance_name} not {status} after {timeout} seconds")
+        time.sleep(delay / 2 + random.uniform(0, delay / 2))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+
+def bake_golden_image(compute, project, zone, serving_mode=SERVING_MODE):
+    """Install the Flask tutorial once and publish the disk as a new golden image.
+
+    A temporary VM runs BAKE_SCRIPT, which installs everything the startup
+    script would and powers off. Its boot disk becomes a new image, named
+    by date, in GOLDEN_IMAGE_FAMILY, so getFromFamily always returns the
+    latest bake and older versions stay available for rollback. The bake
+    VM is deleted afterwards. flaskr.service is sized for MACHINE_TYPE.
+    Returns the image URL.
+    """
+    print(f"\nBaking a new image into family '{GOLDEN_IMAGE_FAMILY}'...")
+    bake_script = render_startup_script(
+        BAKE_SCRIPT, serving_mode, *wsgi_sizing(compute, project, zone, MACHINE_TYPE)
+    )
+    create_instance(
+        compute, project, zone, BAKE_INSTANCE_NAME, MACHINE_TYPE,
+        IMAGE_PROJECT, IMAGE_FAMILY, bake_script, NETWORK_TAG
+    )
+    follower = SerialLogFollower(compute, project, zone)
+    follower.follow(BAKE_INSTANCE_NAME, [BAKE_MARKER])
+    if BAKE_MARKER not in follower.wait(BAKE_TIMEOUT)[BAKE_INSTANCE_NAME]:
+        raise TimeoutError(f"Bake did not complete in {BAKE_TIMEOUT} seconds, "
+                           f"{BAKE_INSTANCE_NAME} is left running for debugging")
+    try:
+        print_bootstrap_report({BAKE_INSTANCE_NAME: get_bootstrap_phases(
+            compute, project, zone, BAKE_INSTANCE_NAME)})
+    except googleapiclient.errors.HttpError:
+        # The bake VM may already be powering off
+        pass
+    wait_for_status(compute, project, zone, BAKE_INSTANCE_NAME, 'TERMINATED')
+
+    image_name = f"{GOLDEN_IMAGE_FAMILY}-{time.strftime('%Y%m%d-%H%M%S')}"
+    print(f"  Creating image '{image_name}'...")
+    operation = compute.images().insert(
+        project=project,
+        body={
+            'name': image_name,
+            'family': GOLDEN_IMAGE_FAMILY,
+            'sourceDisk': f"projects/{project}/zones/{zone}/disks/{BAKE_INSTANCE_NAME}",
+            'labels': INSTANCE_LABELS
+        }
+    ).execute()
+    wait_for_global_operation(compute, project, operation['name'])
+    resource_cache.invalidate('images', f"{project}/{GOLDEN_IMAGE_FAMILY}")
+
+    print(f"  Deleting '{BAKE_INSTANCE_NAME}'...")
+    operation = compute.instances().delete(
+        project=project,
+        zone=zone,
+        instance=BAKE_INSTANCE_NAME
+    ).execute()
+    wait_for_operation(compute, project, zone, operation['name'])
+    return f"projects/{project}/global/images/{image_name}"
+
+def benchmark_golden_image(compute, project, zone, serving_mode=SERVING_MODE):
+    """Time a from-scratch VM and a golden image VM from insert until they serve.
+
+    Both are inserted at once so they see the same conditions. Returns the
+    seconds each took, or None for one that did not serve in time.
+    """
+    startup_script = render_startup_script(
+        STARTUP_SCRIPT, serving_mode, *wsgi_sizing(compute, project, zone, MACHINE_TYPE)
+    )
+    variants = {
+        'scratch': (f"{INSTANCE_NAME}-scratch", IMAGE_PROJECT, IMAGE_FAMILY, startup_script),
+        'golden': (f"{INSTANCE_NAME}-golden", project, GOLDEN_IMAGE_FAMILY, START_SCRIPT),
+    }
+    tracker = OperationTracker(compute, project)
+    start_times = {}
+    for variant, (instance_name, image_project, family, script) in variants.items():
+        config = build_instance_spec(
+            project, zone, instance_name, MACHINE_TYPE,
+            source_image=get_image_from_family(compute, image_project, family),
+            tags=[NETWORK_TAG],
+            metadata={'startup-script': script, 'enable-guest-attributes': 'TRUE'},
+            labels=INSTANCE_LABELS
+        )
+        print(f"  Inserting '{instance_name}' ({variant})...")
+        start_times[instance_name] = time.perf_counter()
+        operation = compute.instances().insert(
+            project=project,
+            zone=zone,
+            body=config
+        ).execute()
+        tracker.register(operation['name'], zone)
+    tracker.wait()
+
+    inventory = InstanceInventory.scan(compute, project, "labels.part = part1")
+    urls = {}
+    for instance_name, *_ in variants.values():
+        record = inventory.get(instance_name, zone)
+        if record and record['ip']:
+            urls[instance_name] = f"http://{record['ip']}:5000"
+
+    def on_ready(instance_name, ready):
+        print(f"  {instance_name} serving after {ready - start_times[instance_name]:.2f} seconds")
+
+    print(f"  Waiting up to {SERVING_TIMEOUT} seconds for both to serve...")
+    ready = wait_until_ready(urls, SERVING_TIMEOUT, on_ready)
+    return {
+        variant: {
+            'instance': instance_name,
+            'serving': (ready[instance_name] - start_times[instance_name]
+                        if ready.get(instance_name) is not None else None)
+        }
+        for variant, (instance_name, *_) in variants.items()
+    }
+
 # Defining the main program
 
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Create a VM running the Flask tutorial")
+    parser.add_argument('--bake', action='store_true',
+                        help=f"install the app once and publish a new image in family {GOLDEN_IMAGE_FAMILY}")
+    parser.add_argument('--golden', action='store_true',
+                        help="boot from the latest golden image and only start the app")
+    parser.add_argument('--benchmark-golden', action='store_true',
+                        help="time a from-scratch VM against a golden image VM until both serve")
+    parser.add_argument('--serving', choices=['wsgi', 'dev'], default=SERVING_MODE,
+                        help="run flaskr under gunicorn sized to MACHINE_TYPE, or the flask development server")
+    parser.add_argument('--follow', action='store_true',
+                        help="stream the startup script output from the serial console until it completes")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="do not wait for the Flask app to answer on port 5000")
+    parser.add_argument('--plan', action='store_true',
+                        help="print the steps without calling the API")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="forget cached image and snapshot selfLinks")
+    parser.add_argument('--inventory', action='store_true',
+                        help="list instances in every zone and exit")
+    parser.add_argument('--phases', action='store_true',
+                        help="collect the bootstrap phase timings every matching VM published and exit")
+    parser.add_argument('--filter', dest='instance_filter',
+                        help="server-side filter for --inventory and --phases, e.g. 'labels.app = flask-tutorial'")
+    parser.add_argument('--status', help="only list instances with this status")
+    parser.add_argument('--label', help="only list instances with this KEY=VALUE label")
+    return parser.parse_args()
+
+def print_plan(args):
+    """Print the steps main() would take."""
+    print(f"\nPlan:")
+    if args.bake:
+        print(f"  1. Create '{BAKE_INSTANCE_NAME}' from {IMAGE_PROJECT}/{IMAGE_FAMILY}, install the app and power off")
+        print(f"  2. Publish its disk as a new image in family '{GOLDEN_IMAGE_FAMILY}' and delete the VM")
+        return
+    print(f"  1. Create firewall rule '{FIREWALL_RULE_NAME}' for tcp:5000 unless it exists")
+    if args.benchmark_golden:
+        print(f"  2. Create '{INSTANCE_NAME}-scratch' from {IMAGE_PROJECT}/{IMAGE_FAMILY} and "
+              f"'{INSTANCE_NAME}-golden' from {GOLDEN_IMAGE_FAMILY} at once")
+        print(f"  3. Time each until http://IP:5000 answers and write {GOLDEN_RESULTS_FILE}")
+        return
+    image = GOLDEN_IMAGE_FAMILY if args.golden else f"{IMAGE_PROJECT}/{IMAGE_FAMILY}"
+    print(f"  2. Create VM '{INSTANCE_NAME}' from {image} with network tag '{NETWORK_TAG}',")
+    print(f"     serving with {'gunicorn sized to ' + MACHINE_TYPE if args.serving == 'wsgi' else 'flask run'}")
+    print(f"  3. Look up the external IP and write part1_config.txt")
+    print(f"  4. Wait until http://IP:5000 answers")
+
 def main():
     """Main function."""
+    args = parse_args()
     print("=" * 70)
     print("  GCP VM Creator with Flask Tutorial Installation")
     print("=" * 70)
@@ -278,18 +482,71 @@ def main():
     print(f"Instance: {INSTANCE_NAME}")
     print(f"Machine Type: {MACHINE_TYPE}")
     
+    if args.inventory:
+        inventory = InstanceInventory.scan(get_compute(), PROJECT_ID, args.instance_filter)
+        print_inventory(inventory, status=args.status,
+                        label=tuple(args.label.split('=', 1)) if args.label else None)
+        return
+    
+    if args.phases:
+        compute = get_compute()
+        inventory = InstanceInventory.scan(compute, PROJECT_ID,
+                                           args.instance_filter or "labels.app = flask-tutorial")
+        records = inventory.find(status=args.status,
+                                 label=tuple(args.label.split('=', 1)) if args.label else None)
+        print_bootstrap_report(harvest_bootstrap_phases(compute, PROJECT_ID, records))
+        print_api_report()
+        return
+    
+    if args.plan:
+        print_plan(args)
+        return
+    
     try:
+        compute = get_compute()
+        if args.refresh_cache:
+            resource_cache.invalidate()
+        
+        if args.bake:
+            image_url = bake_golden_image(compute, PROJECT_ID, ZONE, args.serving)
+            print(f"\nGolden image: {image_url}")
+            print(f"Deploy from it with --golden")
+            print_api_report()
+            return
+        
         # Creating firewall rule
         create_firewall_rule(compute, PROJECT_ID, FIREWALL_RULE_NAME, NETWORK_TAG)
         
-        # Creating VM instance
-        create_instance(
-            compute, PROJECT_ID, ZONE, INSTANCE_NAME, MACHINE_TYPE,
-            IMAGE_PROJECT, IMAGE_FAMILY, STARTUP_SCRIPT
-        )
+        if args.benchmark_golden:
+            print(f"\nStep 2: Timing from-scratch and golden image VMs until they serve...")
+            results = benchmark_golden_image(compute, PROJECT_ID, ZONE, args.serving)
+            with open(GOLDEN_RESULTS_FILE, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"\n{'Variant':<10} {'Instance':<30} {'Time to serving (s)':>20}")
+            for variant, result in results.items():
+                serving = f"{result['serving']:.2f}" if result['serving'] is not None else "-"
+                print(f"{variant:<10} {result['instance']:<30} {serving:>20}")
+            if all(result['serving'] for result in results.values()):
+                print(f"\nGolden image serves {results['scratch']['serving'] / results['golden']['serving']:.1f}x sooner")
+            print(f"\nClean up: gcloud compute instances delete "
+                  f"{' '.join(result['instance'] for result in results.values())} --zone={ZONE}")
+            print_api_report()
+            return
         
-        # Applying network tag
-        apply_network_tag(compute, PROJECT_ID, ZONE, INSTANCE_NAME, NETWORK_TAG)
+        # Creating VM instance, either installing at boot or starting the baked install
+        if args.golden:
+            create_instance(
+                compute, PROJECT_ID, ZONE, INSTANCE_NAME, MACHINE_TYPE,
+                PROJECT_ID, GOLDEN_IMAGE_FAMILY, START_SCRIPT, NETWORK_TAG
+            )
+        else:
+            workers, threads = wsgi_sizing(compute, PROJECT_ID, ZONE, MACHINE_TYPE)
+            if args.serving == 'wsgi':
+                print(f"\nServing with gunicorn: {workers} workers x {threads} threads for {MACHINE_TYPE}")
+            create_instance(
+                compute, PROJECT_ID, ZONE, INSTANCE_NAME, MACHINE_TYPE, IMAGE_PROJECT, IMAGE_FAMILY,
+                render_startup_script(STARTUP_SCRIPT, args.serving, workers, threads), NETWORK_TAG
+            )
         
         # Get the external IP
         external_ip = get_external_ip(compute, PROJECT_ID, ZONE, INSTANCE_NAME)
@@ -306,10 +563,8 @@ def main():
             print(f"   External IP: {external_ip}")
             print(f"\nFlask Application URL:")
             print(f"   http://{external_ip}:5000")
-            print(f"\nWait 2-3 minutes for installation to complete")
-            print(f"\nTo debug:")
-            print(f"   gcloud compute ssh {INSTANCE_NAME} --zone={ZONE}")
-            print(f"   sudo tail -f /var/log/startup-script.log")
+            print(f"\nTo debug (or run with --follow to stream it):")
+            print(f"   gcloud compute instances get-serial-port-output {INSTANCE_NAME} --zone={ZONE}")
             
             # Saving the configuration for other parts
             with open("part1_config.txt", "w") as f:
@@ -319,13 +574,38 @@ def main():
                 f.write(f"EXTERNAL_IP={external_ip}\n")
             
             print(f"\nYour running instances:")
-            instances = list_instances(compute, PROJECT_ID, ZONE)
-            if instances:
-                for instance in instances:
-                    print(f"   - {instance['name']}")
+            for instance in list_instances(compute, PROJECT_ID, ZONE,
+                                           instance_filter='status = RUNNING'):
+                print(f"   - {instance['name']}")
+            
+            if args.follow:
+                marker = START_MARKER if args.golden else INSTALL_MARKER
+                print(f"\nFollowing the serial console until '{marker}'...")
+                follower = SerialLogFollower(compute, PROJECT_ID, ZONE)
+                follower.follow(INSTANCE_NAME, [marker])
+                if marker not in follower.wait(SERVING_TIMEOUT)[INSTANCE_NAME]:
+                    print(f"   '{marker}' not seen within {SERVING_TIMEOUT} seconds")
+            
+            if args.no_wait:
+                print(f"\nWait 2-3 minutes for installation to complete")
+            else:
+                print(f"\nWaiting up to {SERVING_TIMEOUT} seconds for the Flask app...")
+                probe_start = time.perf_counter()
+                ready = wait_until_ready({INSTANCE_NAME: f"http://{external_ip}:5000"})[INSTANCE_NAME]
+                if ready is None:
+                    print(f"   Not serving yet, check the startup script log")
+                else:
+                    print(f"   Serving after {ready - probe_start:.2f} seconds")
+                    phases = get_bootstrap_phases(compute, PROJECT_ID, ZONE, INSTANCE_NAME)
+                    if phases:
+                        print_bootstrap_report({INSTANCE_NAME: phases})
         else:
             print(f"\nCould not retrieve external IP")
         
+        print(f"\nOperation polls: {sum(operation_polls.values())} API calls "
+              f"across {len(operation_polls)} operations")
+        print(f"Resource cache: {resource_cache.hits} hits, {resource_cache.misses} misses")
+        print_api_report()
         print("\n" + "=" * 70)
         
     except Exception as e:
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import json
+import math
+import os
+import statistics
+import sys
+import time
+
+import part2
+
+# Benchmarks clone creation over many trials instead of one run of three.
+#
+# Every trial creates the clones with one of part2's clone modes, records
+# the per-instance creation times and the makespan with time.perf_counter,
+# then deletes the clones (or scales the group back to zero) so the next
+# trial starts from the same state. Warm-up trials run first and are kept
+# in the raw samples but left out of the statistics. The clones of one
+# trial share its conditions, so they are not independent samples: each
+# trial contributes one value per metric, its mean creation time and its
+# makespan. The summary has percentiles, a 95% confidence interval of the
+# mean and the trials that fall outside the Tukey fences, and is written
+# as JSON, CSV and Markdown. Given the JSON of an earlier run in the same
+# mode as --baseline, the script exits non-zero when a metric got slower
+# by more than --threshold and the confidence intervals no longer overlap.
+
+TRIALS = 10  # Measured trials per run
+WARMUP_TRIALS = 1  # Trials run first and left out of the statistics
+REGRESSION_THRESHOLD = 0.10  # Mean slowdown that counts as a regression
+OUTPUT_PREFIX = "clone_benchmark"  # Writes clone_benchmark.json and clone_benchmark.csv
+REPORT_FILE = "BENCHMARK.md"
+PERCENTILES = [50, 90, 99]
+
+# Two-sided 95% critical values of Student's t by degrees of freedom
+T_CRITICAL = {
+    1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365,
+    8: 2.306, 9: 2.262, 10: 2.228, 12: 2.179, 15: 2.131, 20: 2.086,
+    25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980,
+}
+
+def t_critical(df):
+    """Return the 95% t critical value for df, rounding df down to the table."""
+    if df > max(T_CRITICAL):
+        return 1.960
+    return T_CRITICAL[max(key for key in T_CRITICAL if key <= df)]
+
+def percentile(values, p):
+    """Return the p-th percentile of values, interpolating between ranks."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+def summarize(values):
+    """Return the statistics of one metric's samples."""
+    mean = statistics.mean(values)
+    stdev = statistics.stdev(values) if len(values) > 1 else 0.0
+    margin = t_critical(len(values) - 1) * stdev / math.sqrt(len(values)) if len(values) > 1 else 0.0
+    summary = {
+        'n': len(values),
+        'mean': mean,
+        'stdev': stdev,
+        'min': min(values),
+        'max': max(values),
+        'ci_low': mean - margin,
+        'ci_high': mean + margin,
+    }
+    for p in PERCENTILES:
+        summary[f"p{p}"] = percentile(values, p)
+
+    # Tukey fences need a few samples to say anything
+    summary['outliers'] = []
+    if len(values) >= 4:
+        q1, q3 = percentile(values, 25), percentile(values, 75)
+        low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+        summary['outliers'] = [value for value in values if value < low or value > high]
+    return summary
+
+def run_trial(compute, args, label):
+    """Create and delete one round of clones and return its samples."""
+    prefix = f"{args.prefix}-{label}"
+    instance_names = part2.clone_names(prefix, args.num_clones, args.mode)
+    print(f"\n=== Trial {label} ===")
+    try:
+        timings, makespan = part2.create_clones(
+            compute, part2.PROJECT_ID, part2.ZONE, args.mode, instance_names, prefix,
+            part2.SNAPSHOT_NAME, part2.MACHINE_TYPE, args.max_concurrency
+        )
+    except BaseException:
+        # Only delete what the failed trial got to create, and never let a
+        # cleanup error hide the one that failed the trial
+        print(f"  Trial {label} failed, deleting the clones it created...")
+        try:
+            if args.mode != 'mig':
+                instance_names = [
+                    name for name in instance_names
+                    if part2.instance_exists(compute, part2.PROJECT_ID, part2.ZONE, name)
+                ]
+            part2.delete_clones(compute, part2.PROJECT_ID, part2.ZONE, args.mode, instance_names)
+        except Exception as e:
+            print(f"  Cleanup of trial {label} failed: {e}")
+        raise
+    print(f"  Deleting the clones of trial {label}...")
+    part2.delete_clones(compute, part2.PROJECT_ID, part2.ZONE, args.mode, list(timings))
+    return {'label': label, 'timings': timings, 'makespan': makespan}
+
+def summarize_trials(trials):
+    """Summarize the mean creation time and the makespan of each measured trial."""
+    measured = [trial for trial in trials if not trial['warmup']]
+    return {
+        'creation': summarize([statistics.mean(trial['timings'].values()) for trial in measured]),
+        'makespan': summarize([trial['makespan'] for trial in measured]),
+    }
+
+def baseline_mismatch(run, baseline):
+    """Return why a baseline run is not comparable with this one, or None."""
+    for key in ('mode', 'num_clones', 'max_concurrency'):
+        if baseline.get(key) != run.get(key):
+            return f"{key} is {baseline.get(key)} in the baseline but {run.get(key)} now"
+    return None
+
+def find_regressions(summary, baseline, threshold):
+    """Return the metrics that got slower than the baseline beyond noise."""
+    regressions = []
+    for metric, current in summary.items():
+        previous = baseline['summary'].get(metric)
+        if previous is None:
+            continue
+        if current['mean'] > previous['mean'] * (1 + threshold) and current['ci_low'] > previous['ci_high']:
+            regressions.append((metric, previous['mean'], current['mean']))
+    return regressions
+
+def write_csv(path, trials):
+    """Write one row per sample, warm-ups included."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['trial', 'warmup', 'metric', 'instance', 'seconds'])
+        for trial in trials:
+            for name, timing in trial['timings'].items():
+                writer.writerow([trial['label'], trial['warmup'], 'creation', name, f"{timing:.4f}"])
+            writer.writerow([trial['label'], trial['warmup'], 'makespan', '', f"{trial['makespan']:.4f}"])
+
+def write_report(path, run, regressions):
+    """Write the Markdown summary of a run."""
+    with open(path, 'w') as f:
+        f.write("# Part 2 - Clone Creation Benchmark\n\n")
+        f.write(f"*Project:* {part2.PROJECT_ID}\n")
+        f.write(f"*Zone:* {part2.ZONE}\n")
+        f.write(f"*Machine Type:* {part2.MACHINE_TYPE}\n")
+        f.write(f"*Mode:* {run['mode']}, {run['num_clones']} clones per trial\n")
+        f.write(f"*Trials:* {run['trials']} measured after {run['warmup']} warm-up\n\n")
+
+        f.write("## Summary (seconds)\n\n")
+        f.write("| Metric | n | Mean | 95% CI | Stdev | p50 | p90 | p99 | Min | Max | Outliers |\n")
+        f.write("|--------|---|------|--------|-------|-----|-----|-----|-----|-----|----------|\n")
+        for metric, s in run['summary'].items():
+            outliers = ', '.join(f"{value:.2f}" for value in s['outliers']) or "none"
+            f.write(f"| {metric} | {s['n']} | {s['mean']:.2f} | {s['ci_low']:.2f} - {s['ci_high']:.2f} "
+                    f"| {s['stdev']:.2f} | {s['p50']:.2f} | {s['p90']:.2f} | {s['p99']:.2f} "
+                    f"| {s['min']:.2f} | {s['max']:.2f} | {outliers} |\n")
+        f.write("\nEach trial is one sample. Creation is a trial's mean per-instance time from "
+                "insert to DONE; makespan is its wall time. Outliers lie beyond 1.5 IQR of the "
+                "quartiles.\n\n")
+
+        f.write("## Trials\n\n")
+        f.write("| Trial | Warm-up | Makespan (seconds) | Mean creation (seconds) |\n")
+        f.write("|-------|---------|--------------------|-------------------------|\n")
+        for trial in run['trial_results']:
+            f.write(f"| {trial['label']} | {'yes' if trial['warmup'] else 'no'} | {trial['makespan']:.2f} "
+                    f"| {statistics.mean(trial['timings'].values()):.2f} |\n")
+
+        if run.get('baseline'):
+            f.write(f"\n## Regression Check\n\nBaseline: {run['baseline']}\n\n")
+            if regressions:
+                for metric, before, after in regressions:
+                    f.write(f"- *{metric}* regressed: mean {before:.2f} -> {after:.2f} seconds\n")
+            else:
+                f.write("No regressions.\n")
+
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Benchmark clone creation over many trials")
+    parser.add_argument('--mode', choices=['sequential', 'concurrent', 'bulk', 'mig'],
+                        default=part2.CLONE_MODE, help="part2 clone mode to benchmark")
+    parser.add_argument('--num-clones', type=int, default=part2.NUM_CLONES,
+                        help="clones per trial")
+    parser.add_argument('--max-concurrency', type=int,
+                        help="clones in flight at once in concurrent mode (default: --num-clones)")
+    parser.add_argument('--trials', type=int, default=TRIALS,
+                        help="measured trials")
+    parser.add_argument('--warmup', type=int, default=WARMUP_TRIALS,
+                        help="warm-up trials left out of the statistics")
+    parser.add_argument('--prefix', default="bench",
+                        help="name prefix of the clones; the trial label is appended")
+    parser.add_argument('--output', default=OUTPUT_PREFIX,
+                        help="prefix of the JSON and CSV output files")
+    parser.add_argument('--baseline',
+                        help="JSON output of an earlier run to check for regressions")
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help="relative slowdown of the mean that counts as a regression")
+    args = parser.parse_args()
+    if args.max_concurrency is None:
+        args.max_concurrency = args.num_clones
+    if args.trials < 2:
+        parser.error("--trials must be at least 2 for a confidence interval")
+    return args
+
+def main():
+    args = parse_args()
+    compute = part2.get_compute()
+
+    if not part2.instance_exists(compute, part2.PROJECT_ID, part2.ZONE, part2.SOURCE_INSTANCE_NAME):
+        sys.exit(f"Source instance '{part2.SOURCE_INSTANCE_NAME}' does not exist, run Part 1 first")
+    part2.create_snapshot(compute, part2.PROJECT_ID, part2.ZONE,
+                          part2.SOURCE_INSTANCE_NAME, part2.SNAPSHOT_NAME)
+
+    # A baseline recorded in another mode measures something else, so check it before any trial
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        mismatch = baseline_mismatch(
+            {'mode': args.mode, 'num_clones': args.num_clones,
+             'max_concurrency': args.max_concurrency if args.mode == 'concurrent' else None},
+            baseline
+        )
+        if mismatch:
+            sys.exit(f"Baseline {args.baseline} is not comparable: {mismatch}")
+
+    trials = []
+    for i in range(args.warmup + args.trials):
+        warmup = i < args.warmup
+        label = f"w{i + 1}" if warmup else f"t{i - args.warmup + 1}"
+        trial = run_trial(compute, args, label)
+        trial['warmup'] = warmup
+        trials.append(trial)
+
+    run = {
+        'mode': args.mode,
+        'num_clones': args.num_clones,
+        'trials': args.trials,
+        'warmup': args.warmup,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'summary': summarize_trials(trials),
+        'trial_results': trials,
+    }
+    if args.mode == 'concurrent':
+        run['max_concurrency'] = args.max_concurrency
+
+    regressions = []
+    if baseline:
+        regressions = find_regressions(run['summary'], baseline, args.threshold)
+        run['baseline'] = os.path.abspath(args.baseline)
+
+    with open(f"{args.output}.json", 'w') as f:
+        json.dump(run, f, indent=2)
+    write_csv(f"{args.output}.csv", trials)
+    write_report(REPORT_FILE, run, regressions)
+
+    print(f"\n{'Metric':<10} {'n':>4} {'mean':>8} {'95% CI':>17} {'p50':>8} {'p90':>8} {'p99':>8}")
+    for metric, s in run['summary'].items():
+        print(f"{metric:<10} {s['n']:>4} {s['mean']:>8.2f} {s['ci_low']:>8.2f}-{s['ci_high']:<8.2f} "
+              f"{s['p50']:>8.2f} {s['p90']:>8.2f} {s['p99']:>8.2f}")
+        if s['outliers']:
+            print(f"{'':<10} outliers: {', '.join(f'{value:.2f}' for value in s['outliers'])}")
+    print(f"\nWrote {args.output}.json, {args.output}.csv and {REPORT_FILE}")
+    part2.print_api_report()
+
+    if regressions:
+        for metric, before, after in regressions:
+            print(f"REGRESSION: {metric} mean {before:.2f} -> {after:.2f} seconds", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
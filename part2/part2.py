@@ -1,14 +1,32 @@
 #!/usr/bin/env python3
 
+import argparse
+import collections
+import json
+import os
+import queue
+import random
 import time
 import sys
-import googleapiclient.discovery
+import threading
+from datetime import datetime
+import googleapiclient.errors
 import google.auth
 
-# Get the credentials and project
-credentials, _ = google.auth.default()
+# The helpers shared by all three parts live in compute_common.py at the top of the repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compute_common
+from compute_common import (
+    SERVING_TIMEOUT, PROBE_MAX_DELAY, SERIAL_MAX_DELAY, OPERATION_TIMEOUT,
+    POLL_INITIAL_DELAY, OPERATION_POLL_MAX_DELAY,
+    print_api_report, build_instance_spec, resource_cache, operation_polls,
+    OperationTracker, wait_for_operation, wait_for_global_operation, wait_until_ready,
+    ReadinessProber, SerialLogFollower, list_instances, InstanceInventory, print_inventory,
+    instance_exists
+)
+
+# Get the project, the compute client is built on first use by get_compute()
 PROJECT_ID = "lab5cloud-474120"  # Giving the project id
-compute = googleapiclient.discovery.build('compute', 'v1', credentials=credentials)
 
 # CONFIGURATION
 
@@ -18,62 +36,31 @@ SNAPSHOT_NAME = f"base-snapshot-{SOURCE_INSTANCE_NAME}"
 NEW_INSTANCE_PREFIX = "cloned-instance"
 MACHINE_TYPE = "f1-micro"
 NUM_CLONES = 3
+CLONE_LABELS = {'app': 'flask-tutorial', 'part': 'part2'}
+CLONE_MODE = "sequential"  # "sequential", "concurrent", "bulk" or "mig"
+IMAGE_NAME = f"base-image-{SOURCE_INSTANCE_NAME}"  # Image made from the snapshot
+TEMPLATE_NAME = f"{NEW_INSTANCE_PREFIX}-template"  # Instance template used in mig mode
+GROUP_NAME = f"{NEW_INSTANCE_PREFIX}-group"  # Managed instance group used in mig mode
+MACHINE_IMAGE_NAME = f"machine-image-{SOURCE_INSTANCE_NAME}"  # Machine image of the source VM
+CLONE_SOURCES = ["snapshot", "image", "machine-image", "disk"]  # Sources --benchmark-sources compares
+SOURCE_RESULTS_FILE = "source_results.json"  # Results of the clone-source benchmark
+BOOT_MARKER = "Reached target"  # First serial console line that counts as the guest booted
+LIFECYCLE_FILE = "lifecycle.json"  # Per-instance phase timelines of every traced clone
+HISTOGRAM_BINS = 8  # Bins per phase histogram in TIMING.md
+SOURCE_CHECK_TIMEOUT = 60  # Seconds to wait for the source VM to serve before snapshotting it
+TIMING_RESULTS_FILE = "timing_results.json"  # Results of every mode, used to build TIMING.md
 
 # Define the helper functions
 
-# Define the wait_for_operation for the zone operation
-def wait_for_operation(compute, project, zone, operation):
-    """Wait for a zone operation to complete."""
-    print(f"  Waiting for operation to complete...")
-    while True:
-        result = compute.zoneOperations().get(
-            project=project,
-            zone=zone,
-            operation=operation
-        ).execute()
+# Defining the lazily built compute client
+def get_credentials():
+    """Load the application default credentials."""
+    credentials, _ = google.auth.default()
+    return credentials
 
-        if result['status'] == 'DONE':
-            if 'error' in result:
-                raise Exception(result['error'])
-            print(f"  Operation completed")
-            return result
-        time.sleep(1)
-
-# Defining the wait_for_global_operation for completing the global operation
-def wait_for_global_operation(compute, project, operation):
-    """Wait for a global operation to complete."""
-    print(f"  Waiting for operation to complete...")
-    while True:
-        result = compute.globalOperations().get(
-            project=project,
-            operation=operation
-        ).execute()
-
-        if result['status'] == 'DONE':
-            if 'error' in result:
-                raise Exception(result['error'])
-            print(f"  Operation completed")
-            return result
-        time.sleep(1)
-
-# Defining list_instances to get the list of all the instances in the zone
-def list_instances(compute, project, zone):
-    """List all instances in a zone."""
-    result = compute.instances().list(project=project, zone=zone).execute()
-    return result['items'] if 'items' in result else None
-
-# Defining the instance_exits
-def instance_exists(compute, project, zone, instance_name):
-    """Check if an instance exists."""
-    try:
-        compute.instances().get(
-            project=project,
-            zone=zone,
-            instance=instance_name
-        ).execute()
-        return True
-    except:
-        return False
+def get_compute():
+    """Build the compute client on first use."""
+    return compute_common.get_compute(get_credentials)
 
 # Defining the boot disl names for the instance
 def get_boot_disk_name(compute, project, zone, instance_name):
@@ -81,7 +68,8 @@ def get_boot_disk_name(compute, project, zone, instance_name):
     instance = compute.instances().get(
         project=project,
         zone=zone,
-        instance=instance_name
+        instance=instance_name,
+        fields='disks(boot,source)'
     ).execute()
     
     for disk in instance['disks']:
@@ -96,15 +84,32 @@ def get_boot_disk_name(compute, project, zone, instance_name):
 
 # Checking whether 
 def snapshot_exists(compute, project, snapshot_name):
-    """Check if a snapshot exists."""
+    """Check if a snapshot exists, caching its selfLink when it does."""
     try:
-        compute.snapshots().get(
+        snapshot = compute.snapshots().get(
             project=project,
-            snapshot=snapshot_name
+            snapshot=snapshot_name,
+            fields='selfLink'
         ).execute()
-        return True
-    except:
+    except googleapiclient.errors.HttpError as e:
+        if e.resp.status != 404:
+            raise
+        resource_cache.invalidate('snapshots', f"{project}/{snapshot_name}")
         return False
+    resource_cache.put('snapshots', f"{project}/{snapshot_name}", snapshot['selfLink'])
+    return True
+
+# Getting the snapshot URL the clones boot from
+def get_snapshot_url(compute, project, snapshot_name):
+    """Get the selfLink of a snapshot, cached for RESOURCE_CACHE_TTL."""
+    return resource_cache.get(
+        'snapshots', f"{project}/{snapshot_name}",
+        lambda: compute.snapshots().get(
+            project=project,
+            snapshot=snapshot_name,
+            fields='selfLink'
+        ).execute()['selfLink']
+    )
 
 # MAIN FUNCTIONS
 
@@ -140,72 +145,63 @@ def create_snapshot(compute, project, zone, instance_name, snapshot_name):
     wait_for_operation(compute, project, zone, operation['name'])
     print(f"  Snapshot '{snapshot_name}' created successfully")
 
-def create_instance_from_snapshot(compute, project, zone, instance_name, 
+# Building the insert body of a clone
+def build_clone_spec(project, zone, instance_name, machine_type, source, source_url):
+    """Build the insert body of a clone booting from a snapshot, an image or an existing disk.
+
+    The shared spec boots a new disk from an image; snapshot clones swap in
+    the snapshot as the disk's source, and disk clones boot the disk itself.
+    """
+    spec = build_instance_spec(
+        project, zone, instance_name, machine_type,
+        source_image=source_url if source == 'image' else None,
+        tags=['allow-5000'],
+        labels=CLONE_LABELS
+    )
+    boot_disk = spec['disks'][0]
+    if source == 'snapshot':
+        params = boot_disk['initializeParams']
+        del params['sourceImage']
+        params['sourceSnapshot'] = source_url
+    elif source == 'disk':
+        del boot_disk['initializeParams']
+        boot_disk['source'] = source_url
+    return spec
+
+def insert_instance_from_snapshot(compute, project, zone, instance_name,
                                   snapshot_name, machine_type):
-    """Create an instance from a snapshot."""
-    print(f"\nCreating instance '{instance_name}' from snapshot...")
-    
+    """Start creating an instance from a snapshot and return the operation."""
     # Get the snapshot URL
-    snapshot = compute.snapshots().get(
-        project=project,
-        snapshot=snapshot_name
-    ).execute()
-    
-    snapshot_url = snapshot['selfLink']
-    machine_type_url = f"zones/{zone}/machineTypes/{machine_type}"
+    snapshot_url = get_snapshot_url(compute, project, snapshot_name)
     
     # Configuring instance
-    config = {
-        'name': instance_name,
-        'machineType': machine_type_url,
-        
-        # Boot disk from snapshot
-        'disks': [
-            {
-                'boot': True,
-                'autoDelete': True,
-                'initializeParams': {
-                    'sourceSnapshot': snapshot_url,
-                    'diskSizeGb': 10
-                }
-            }
-        ],
-        
-        # Assigning Network interface with external IP
-        'networkInterfaces': [
-            {
-                'network': f'projects/{project}/global/networks/default',
-                'accessConfigs': [
-                    {
-                        'type': 'ONE_TO_ONE_NAT',
-                        'name': 'External NAT'
-                    }
-                ]
-            }
-        ],
-        
-        # Applying network tag for firewall
-        'tags': {
-            'items': ['allow-5000']
-        }
-    }
-    
-    # Start timer
-    start_time = time.time()
+    config = build_clone_spec(project, zone, instance_name, machine_type, 'snapshot', snapshot_url)
     
-    operation = compute.instances().insert(
+    return compute.instances().insert(
         project=project,
         zone=zone,
         body=config
     ).execute()
+
+def create_instance_from_snapshot(compute, project, zone, instance_name, 
+                                  snapshot_name, machine_type):
+    """Create an instance from a snapshot."""
+    print(f"\nCreating instance '{instance_name}' from snapshot...")
+    
+    # Start timer
+    start_time = clone_start_times[instance_name] = time.perf_counter()
+    
+    operation = insert_instance_from_snapshot(
+        compute, project, zone, instance_name, snapshot_name, machine_type
+    )
     
     wait_for_operation(compute, project, zone, operation['name'])
     
     # End timer
-    end_time = time.time()
+    end_time = time.perf_counter()
     elapsed_time = end_time - start_time
     
-    print(f"  Instance created in {elapsed_time:.2f} seconds")
+    print(f"  Instance '{instance_name}' created in {elapsed_time:.2f} seconds")
     
     return elapsed_time
 
@@ -214,20 +210,934 @@ def get_external_ip(compute, project, zone, instance_name):
     instance = compute.instances().get(
         project=project,
         zone=zone,
-        instance=instance_name
+        instance=instance_name,
+        fields='networkInterfaces/accessConfigs/natIP'
     ).execute()
     
-    for interface in instance['networkInterfaces']:
+    for interface in instance.get('networkInterfaces', []):
         if 'accessConfigs' in interface:
             for access_config in interface['accessConfigs']:
                 if 'natIP' in access_config:
                     return access_config['natIP']
     return None
 
-# Defining the main program 
+# Checking that the source VM serves before it is snapshotted
+def check_source_serving(compute, project, zone, instance_name, timeout=SOURCE_CHECK_TIMEOUT):
+    """Warn if the source instance does not answer on port 5000.
+
+    Clones only serve on boot if the source registered flaskr.service,
+    which part1's startup script does; a source that is not serving yet
+    would be snapshotted before that happened.
+    """
+    external_ip = get_external_ip(compute, project, zone, instance_name)
+    if external_ip:
+        url = f"http://{external_ip}:5000"
+        print(f"  Checking that {url} serves before snapshotting...")
+        if wait_until_ready({instance_name: url}, timeout)[instance_name] is not None:
+            print(f"  Source instance is serving")
+            return True
+    print(f"  Warning: '{instance_name}' is not serving on port 5000, so the clones will not serve "
+          f"either. Rerun part1 so flaskr.service is installed and started.")
+    return False
+
+# CLONE MODES
+
+# time.perf_counter() reading when each clone was requested, so time to serving can be measured
+clone_start_times = {}
+
+def create_clones_sequentially(compute, project, zone, instance_names,
+                               snapshot_name, machine_type, on_created=None):
+    """Create the clones one after another, waiting for each one."""
+    timings = {}
+    for i, instance_name in enumerate(instance_names, 1):
+        print(f"\n--- Clone {i}/{len(instance_names)} ---")
+        timings[instance_name] = create_instance_from_snapshot(
+            compute, project, zone, instance_name, snapshot_name, machine_type
+        )
+        if on_created:
+            on_created(instance_name)
+    return timings
+
+def create_clones_concurrently(compute, project, zone, instance_names,
+                               snapshot_name, machine_type, max_concurrency, on_created=None):
+    """Create the clones in parallel with at most max_concurrency in flight.
+
+    Inserts are issued up front and one OperationTracker waits on all of
+    them, starting the next queued clone as soon as one finishes.
+    """
+    print(f"\n--- Creating {len(instance_names)} clones, "
+          f"up to {max_concurrency} at a time ---")
+    tracker = OperationTracker(compute, project)
+    waiting = list(instance_names)
+    start_times = {}
+    timings = {}
+    futures = []
+
+    def clone_done(instance_name):
+        def callback(future):
+            if future.exception() is None:
+                timings[instance_name] = time.perf_counter() - start_times[instance_name]
+                print(f"  Instance '{instance_name}' created in {timings[instance_name]:.2f} seconds")
+                if on_created:
+                    on_created(instance_name)
+        return callback
+
+    while waiting or tracker.pending:
+        while waiting and len(tracker.pending) < max_concurrency:
+            instance_name = waiting.pop(0)
+            print(f"  Inserting '{instance_name}'...")
+            start_times[instance_name] = clone_start_times[instance_name] = time.perf_counter()
+            operation = insert_instance_from_snapshot(
+                compute, project, zone, instance_name, snapshot_name, machine_type
+            )
+            futures.append(tracker.register(operation['name'], zone, clone_done(instance_name)))
+        tracker.tick()
+
+    # Raise the first failure, if any clone failed
+    for future in futures:
+        future.result()
+
+    # Keep the report in clone order rather than completion order
+    return {name: timings[name] for name in instance_names}
+
+def clone_names(prefix, count, mode):
+    """Return the clone names, matching what bulkInsert's namePattern produces."""
+    # bulkInsert pads the numbers to the count of '#' in the pattern
+    width = len(str(count)) if mode == 'bulk' else 1
+    return [f"{prefix}-{i:0{width}d}" for i in range(1, count + 1)]
+
+def create_clones_in_bulk(compute, project, zone, instance_names, prefix,
+                          snapshot_name, machine_type, on_created=None):
+    """Create all the clones with one bulkInsert request and one operation.
+
+    bulkInsert reports a single operation for the whole batch, so every
+    clone's creation time is the time until that operation is DONE.
+    """
+    count = len(instance_names)
+    print(f"\n--- Creating {count} clones with one bulkInsert ---")
+    properties = build_clone_spec(
+        project, zone, None, machine_type,
+        'snapshot', get_snapshot_url(compute, project, snapshot_name)
+    )
+    # Instance properties take a bare machine type name and no instance name
+    del properties['name']
+    properties['machineType'] = machine_type
+    # namePattern numbers after the highest existing match, so leftover
+    # clones shift the names; a per-run label finds the real ones afterwards
+    run_label = f"run-{int(time.time())}"
+    properties['labels'] = dict(properties.get('labels', {}), bulk=run_label)
+    body = {
+        'count': count,
+        'namePattern': f"{prefix}-{'#' * len(str(count))}",
+        'instanceProperties': properties
+    }
+
+    start_time = time.perf_counter()
+    operation = compute.instances().bulkInsert(
+        project=project,
+        zone=zone,
+        body=body
+    ).execute()
+    wait_for_operation(compute, project, zone, operation['name'])
+    elapsed_time = time.perf_counter() - start_time
+
+    created = sorted(
+        (instance['name'] for instance in list_instances(
+            compute, project, zone,
+            instance_filter=f'labels.bulk = "{run_label}"',
+            fields='items(name)'
+        )),
+        key=lambda name: (len(name), name)
+    )
+    if created != instance_names:
+        print(f"  bulkInsert named the clones {', '.join(created)} "
+              f"(leftover instances match {prefix}-*)")
+    clone_start_times.update(dict.fromkeys(created, start_time))
+
+    print(f"  {len(created)} instances created in {elapsed_time:.2f} seconds")
+    if on_created:
+        for instance_name in created:
+            on_created(instance_name)
+    return {instance_name: elapsed_time for instance_name in created}
+
+def create_clones(compute, project, zone, mode, instance_names, prefix,
+                  snapshot_name, machine_type, max_concurrency=None,
+                  on_created=None):
+    """Create the clones in the given mode and return their timings and the makespan.
+
+    max_concurrency defaults to all the clones in flight at once.
+    on_created(instance_name), if given, is called as soon as each clone's
+    insert is DONE, or for every clone once the batch is in bulk and mig mode.
+    """
+    makespan_start = time.perf_counter()
+    if mode == 'mig':
+        timings = create_clones_with_group(
+            compute, project, zone, len(instance_names), prefix,
+            snapshot_name, machine_type, on_created
+        )
+    elif mode == 'bulk':
+        timings = create_clones_in_bulk(
+            compute, project, zone, instance_names, prefix,
+            snapshot_name, machine_type, on_created
+        )
+    elif mode == 'concurrent':
+        timings = create_clones_concurrently(
+            compute, project, zone, instance_names, snapshot_name,
+            machine_type, max_concurrency or len(instance_names), on_created
+        )
+    else:
+        timings = create_clones_sequentially(
+            compute, project, zone, instance_names,
+            snapshot_name, machine_type, on_created
+        )
+    return timings, time.perf_counter() - makespan_start
+
+def delete_clones(compute, project, zone, mode, instance_names):
+    """Delete the clones again, or scale the group back to zero in mig mode."""
+    if mode == 'mig':
+        operation = compute.instanceGroupManagers().resize(
+            project=project,
+            zone=zone,
+            instanceGroupManager=GROUP_NAME,
+            size=0
+        ).execute()
+        wait_for_operation(compute, project, zone, operation['name'])
+        wait_for_group_stable(compute, project, zone, GROUP_NAME)
+        return
+
+    tracker = OperationTracker(compute, project)
+    for instance_name in instance_names:
+        operation = compute.instances().delete(
+            project=project,
+            zone=zone,
+            instance=instance_name
+        ).execute()
+        tracker.register(operation['name'], zone)
+    tracker.wait()
+
+# Checking whether a global resource (image, instance template) exists
+def get_global_resource(collection, project, fields='name', **name):
+    """Get a global resource's fields, or None if it does not exist."""
+    try:
+        return collection.get(project=project, fields=fields, **name).execute()
+    except googleapiclient.errors.HttpError as e:
+        if e.resp.status == 404:
+            return None
+        raise
+
+def global_resource_exists(collection, project, **name):
+    """Check if a global resource exists, e.g. global_resource_exists(compute.images(), p, image=n)."""
+    return get_global_resource(collection, project, **name) is not None
+
+def delete_global_resource(compute, collection, project, **name):
+    """Delete a global resource and wait for the deletion."""
+    operation = collection.delete(project=project, **name).execute()
+    wait_for_global_operation(compute, project, operation['name'])
+
+def create_image_from_snapshot(compute, project, snapshot_name, image_name):
+    """Create a custom image from the snapshot, and return its URL.
+
+    An existing image is reused only if it was made from the current
+    snapshot; one made from an older snapshot of the same name is replaced.
+    """
+    snapshot_id = compute.snapshots().get(
+        project=project, snapshot=snapshot_name, fields='id'
+    ).execute()['id']
+    image = get_global_resource(compute.images(), project, fields='sourceSnapshotId', image=image_name)
+    if image is not None and image.get('sourceSnapshotId') == snapshot_id:
+        print(f"  Image '{image_name}' already exists, skipping creation")
+        return f"projects/{project}/global/images/{image_name}"
+    if image is not None:
+        print(f"  Image '{image_name}' was made from an older snapshot, replacing it...")
+        delete_global_resource(compute, compute.images(), project, image=image_name)
+    print(f"  Creating image '{image_name}' from snapshot...")
+    operation = compute.images().insert(
+        project=project,
+        body={
+            'name': image_name,
+            'sourceSnapshot': get_snapshot_url(compute, project, snapshot_name)
+        }
+    ).execute()
+    wait_for_global_operation(compute, project, operation['name'])
+    return f"projects/{project}/global/images/{image_name}"
+
+def template_is_current(compute, project, template_name, image_url, machine_type):
+    """Check that a template exists, boots the current image and uses machine_type.
+
+    A template older than its image was made for an earlier image of the
+    same name, so it counts as stale too.
+    """
+    template = get_global_resource(
+        compute.instanceTemplates(), project,
+        fields='creationTimestamp,properties(machineType,disks/initializeParams/sourceImage)',
+        instanceTemplate=template_name
+    )
+    if template is None:
+        return False
+    image = compute.images().get(
+        project=project, image=image_url.split('/')[-1], fields='creationTimestamp'
+    ).execute()
+    properties = template['properties']
+    return (
+        properties['disks'][0]['initializeParams'].get('sourceImage', '').endswith(image_url)
+        and properties['machineType'].split('/')[-1] == machine_type
+        and parse_timestamp(template['creationTimestamp']) >= parse_timestamp(image['creationTimestamp'])
+    )
+
+def create_instance_template(compute, project, zone, template_name, image_url, machine_type):
+    """Create an instance template booting from the image, replacing a stale one."""
+    if template_is_current(compute, project, template_name, image_url, machine_type):
+        print(f"  Instance template '{template_name}' already exists, skipping creation")
+        return f"projects/{project}/global/instanceTemplates/{template_name}"
+    if global_resource_exists(compute.instanceTemplates(), project, instanceTemplate=template_name):
+        print(f"  Instance template '{template_name}' does not match the current image or machine type, replacing it...")
+        delete_global_resource(compute, compute.instanceTemplates(), project,
+                               instanceTemplate=template_name)
+    print(f"  Creating instance template '{template_name}'...")
+    properties = build_instance_spec(
+        project, zone, None, machine_type,
+        source_image=image_url,
+        tags=['allow-5000'],
+        labels=CLONE_LABELS
+    )
+    # Template properties take a bare machine type name and no instance name
+    del properties['name']
+    properties['machineType'] = machine_type
+    operation = compute.instanceTemplates().insert(
+        project=project,
+        body={'name': template_name, 'properties': properties}
+    ).execute()
+    wait_for_global_operation(compute, project, operation['name'])
+    return f"projects/{project}/global/instanceTemplates/{template_name}"
+
+def wait_for_group_stable(compute, project, zone, group_name, timeout=OPERATION_TIMEOUT):
+    """Poll a managed instance group with backoff until every instance is running."""
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
+    while True:
+        group = compute.instanceGroupManagers().get(
+            project=project,
+            zone=zone,
+            instanceGroupManager=group_name,
+            fields='status/isStable'
+        ).execute()
+        if group.get('status', {}).get('isStable'):
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Group {group_name} not stable after {timeout} seconds")
+        time.sleep(delay / 2 + random.uniform(0, delay / 2))
+        delay = min(delay * 2, OPERATION_POLL_MAX_DELAY)
+
+# Defining clone creation through a managed instance group
+def create_clones_with_group(compute, project, zone, count, prefix,
+                             snapshot_name, machine_type, on_created=None):
+    """Create the clones by scaling a managed instance group to count.
+
+    Each clone is given the time from the resize request until the group is stable.
+    """
+    print(f"\n--- Creating {count} clones with managed instance group '{GROUP_NAME}' ---")
+    image_url = create_image_from_snapshot(compute, project, snapshot_name, IMAGE_NAME)
+    template_current = template_is_current(
+        compute, project, TEMPLATE_NAME, image_url, machine_type
+    )
+
+    try:
+        group = compute.instanceGroupManagers().get(
+            project=project, zone=zone, instanceGroupManager=GROUP_NAME,
+            fields='targetSize'
+        ).execute()
+    except googleapiclient.errors.HttpError as e:
+        if e.resp.status != 404:
+            raise
+        group = None
+    if group is not None and not template_current:
+        # The stale template cannot be replaced while the group uses it
+        print(f"  Group '{GROUP_NAME}' uses a stale template, deleting the group...")
+        operation = compute.instanceGroupManagers().delete(
+            project=project, zone=zone, instanceGroupManager=GROUP_NAME
+        ).execute()
+        wait_for_operation(compute, project, zone, operation['name'])
+        group = None
+    elif group is not None and group.get('targetSize', 0) != 0:
+        # Resizing a group that already has count instances is a no-op, so start from zero
+        print(f"  Group '{GROUP_NAME}' has {group['targetSize']} instances, scaling it to 0 first...")
+        delete_clones(compute, project, zone, 'mig', [])
+    elif group is not None:
+        print(f"  Group '{GROUP_NAME}' already exists and is empty")
+
+    template_url = create_instance_template(
+        compute, project, zone, TEMPLATE_NAME, image_url, machine_type
+    )
+    if group is None:
+        print(f"  Creating empty group '{GROUP_NAME}'...")
+        operation = compute.instanceGroupManagers().insert(
+            project=project,
+            zone=zone,
+            body={
+                'name': GROUP_NAME,
+                'baseInstanceName': prefix,
+                'instanceTemplate': template_url,
+                'targetSize': 0
+            }
+        ).execute()
+        wait_for_operation(compute, project, zone, operation['name'])
+
+    print(f"  Resizing group to {count}...")
+    start_time = time.perf_counter()
+    operation = compute.instanceGroupManagers().resize(
+        project=project,
+        zone=zone,
+        instanceGroupManager=GROUP_NAME,
+        size=count
+    ).execute()
+    wait_for_operation(compute, project, zone, operation['name'])
+    wait_for_group_stable(compute, project, zone, GROUP_NAME)
+    elapsed_time = time.perf_counter() - start_time
+    print(f"  Group stable with {count} instances in {elapsed_time:.2f} seconds")
+
+    managed = compute.instanceGroupManagers().listManagedInstances(
+        project=project,
+        zone=zone,
+        instanceGroupManager=GROUP_NAME,
+        fields='managedInstances/instance'
+    ).execute()
+    instance_names = sorted(
+        instance['instance'].split('/')[-1]
+        for instance in managed.get('managedInstances', [])
+    )
+    clone_start_times.update(dict.fromkeys(instance_names, start_time))
+    if on_created:
+        for instance_name in instance_names:
+            on_created(instance_name)
+    return {instance_name: elapsed_time for instance_name in instance_names}
+
+# CLONE SOURCES
+
+def create_machine_image(compute, project, zone, instance_name, machine_image_name):
+    """Create a machine image of the source instance unless it exists, and return its URL."""
+    if global_resource_exists(compute.machineImages(), project, machineImage=machine_image_name):
+        print(f"  Machine image '{machine_image_name}' already exists, skipping creation")
+    else:
+        print(f"  Creating machine image '{machine_image_name}'...")
+        operation = compute.machineImages().insert(
+            project=project,
+            body={
+                'name': machine_image_name,
+                'sourceInstance': f"projects/{project}/zones/{zone}/instances/{instance_name}"
+            }
+        ).execute()
+        wait_for_global_operation(compute, project, operation['name'])
+    return f"projects/{project}/global/machineImages/{machine_image_name}"
+
+def insert_clone_from_source(compute, project, zone, instance_name, source, source_url,
+                             machine_type):
+    """Start creating a clone from one kind of source and return the operation."""
+    if source == 'machine-image':
+        # The machine image carries the disks, network and tags of the source VM,
+        # and its metadata too; empty metadata in the body drops the source's
+        # startup-script, so this clone boots like the others
+        return compute.instances().insert(
+            project=project,
+            zone=zone,
+            sourceMachineImage=source_url,
+            body={'name': instance_name, 'labels': CLONE_LABELS, 'metadata': {'items': []}}
+        ).execute()
+
+    if source == 'disk':
+        # Clone the boot disk directly, then boot the instance from the copy
+        disk_name = f"{instance_name}-disk"
+        operation = compute.disks().insert(
+            project=project,
+            zone=zone,
+            body={'name': disk_name, 'sourceDisk': source_url}
+        ).execute()
+        wait_for_operation(compute, project, zone, operation['name'])
+        config = build_clone_spec(
+            project, zone, instance_name, machine_type,
+            'disk', f"projects/{project}/zones/{zone}/disks/{disk_name}"
+        )
+    else:
+        config = build_clone_spec(project, zone, instance_name, machine_type, source, source_url)
+    return compute.instances().insert(
+        project=project,
+        zone=zone,
+        body=config
+    ).execute()
+
+def start_probing(prober, compute, project, zone, instance_name):
+    """Look up a new clone's external IP and start probing its Flask port."""
+    ip = get_external_ip(compute, project, zone, instance_name)
+    if ip:
+        prober.add(instance_name, f"http://{ip}:5000")
+
+def wait_for_serving(prober, start_times):
+    """Wait for a ReadinessProber or CloneWatcher and return the seconds each clone took to serve.
+
+    Times are measured from start_times[name], a time.perf_counter()
+    reading; clones that never answer before the timeout are left out.
+    """
+    ready = prober.wait()
+    return {name: at - start_times[name] for name, at in ready.items() if at is not None}
+
+def report_serving(start_times):
+    """Return an on_ready callback that prints each clone's time to serving."""
+    def on_ready(name, ready):
+        print(f"  {name} serving after {ready - start_times[name]:.2f} seconds")
+
+    return on_ready
+
+def benchmark_clone_sources(compute, project, zone, sources, prefix, snapshot_name,
+                            machine_type):
+    """Create one clone per source and time its creation and its time to serving.
+
+    Creation latency runs from the first API request for the clone (the
+    disk copy counts for disk clones) until the instance insert is DONE.
+    Time to serving runs from the same start until http://IP:5000 answers.
+    Each clone is probed from the moment its own insert is done, so a
+    source's serving time does not depend on its place in the list.
+    Shared sources (image, machine image) are prepared before timing.
+    """
+    source_urls = {}
+    if 'snapshot' in sources:
+        source_urls['snapshot'] = get_snapshot_url(compute, project, snapshot_name)
+    if 'image' in sources:
+        source_urls['image'] = create_image_from_snapshot(compute, project, snapshot_name, IMAGE_NAME)
+    if 'machine-image' in sources:
+        source_urls['machine-image'] = create_machine_image(
+            compute, project, zone, SOURCE_INSTANCE_NAME, MACHINE_IMAGE_NAME
+        )
+    if 'disk' in sources:
+        disk_name = get_boot_disk_name(compute, project, zone, SOURCE_INSTANCE_NAME)
+        source_urls['disk'] = f"projects/{project}/zones/{zone}/disks/{disk_name}"
+
+    names = {source: f"{prefix}-from-{source}" for source in sources}
+    start_times = {}
+    creation = {}
+    prober = ReadinessProber(SERVING_TIMEOUT, report_serving(start_times))
+    for source in sources:
+        instance_name = names[source]
+        print(f"\nCreating '{instance_name}' from {source}...")
+        start_times[instance_name] = time.perf_counter()
+        operation = insert_clone_from_source(
+            compute, project, zone, instance_name, source, source_urls[source], machine_type
+        )
+        wait_for_operation(compute, project, zone, operation['name'])
+        creation[source] = time.perf_counter() - start_times[instance_name]
+        print(f"  Created in {creation[source]:.2f} seconds")
+        start_probing(prober, compute, project, zone, instance_name)
+
+    print(f"\nWaiting for the clones to serve on port 5000...")
+    serving = wait_for_serving(prober, start_times)
+
+    return {
+        source: {
+            'instance': names[source],
+            'creation': creation[source],
+            'serving': serving.get(names[source])
+        }
+        for source in sources
+    }
+
+# LIFECYCLE
+
+# Phases in timeline order; each is the span from the previous event
+LIFECYCLE_EVENTS = ['accepted', 'started', 'done', 'running', 'booted', 'serving']
+LIFECYCLE_PHASES = {
+    'queued': ('accepted', 'started'),
+    'provisioning': ('started', 'done'),
+    'starting': ('done', 'running'),
+    'booting': ('running', 'booted'),
+    'app start': ('booted', 'serving'),
+}
+
+def parse_timestamp(value):
+    """Return an RFC 3339 API timestamp as epoch seconds."""
+    return datetime.fromisoformat(value).timestamp()
+
+# Defining the server-side lifecycle events of a clone
+def get_server_events(compute, project, zone, instance_name):
+    """Return the server-side lifecycle timestamps of an instance.
+
+    Reads its insert operation by targetId, so bulk and group clones are covered too.
+    """
+    instance = compute.instances().get(
+        project=project,
+        zone=zone,
+        instance=instance_name,
+        fields='id,lastStartTimestamp,networkInterfaces/accessConfigs/natIP'
+    ).execute()
+    operations = compute.zoneOperations().list(
+        project=project,
+        zone=zone,
+        filter=f"(targetId = {instance['id']}) AND (operationType = insert)",
+        fields='items(insertTime,startTime,endTime)'
+    ).execute().get('items', [])
+
+    events = {}
+    if operations:
+        for event, key in (('accepted', 'insertTime'), ('started', 'startTime'), ('done', 'endTime')):
+            if key in operations[0]:
+                events[event] = parse_timestamp(operations[0][key])
+    if 'lastStartTimestamp' in instance:
+        events['running'] = parse_timestamp(instance['lastStartTimestamp'])
+
+    ip = None
+    for interface in instance.get('networkInterfaces', []):
+        for access_config in interface.get('accessConfigs', []):
+            ip = ip or access_config.get('natIP')
+    return events, ip
+
+# Defining the watcher that follows each clone from its insert to serving
+class CloneWatcher:
+    """Watch each clone boot and serve from the moment its insert is done.
+
+    create_clones calls add() per clone; a background thread with its own compute client probes it.
+    """
+
+    def __init__(self, project, zone, timeout=SERVING_TIMEOUT, boot_marker=None, on_ready=None):
+        self.project = project
+        self.zone = zone
+        self.timeout = timeout
+        self.boot_marker = boot_marker
+        self.on_ready = on_ready
+        self.serving = {}  # instance name -> time.time() of the first HTTP 200
+        self.queue = queue.Queue()
+        self.added = threading.Event()
+        self.compute = compute_common.build_compute(get_credentials())
+        # A new clone cuts the console backoff short, so it is watched right away
+        self.follower = SerialLogFollower(self.compute, project, zone,
+                                          on_line=lambda name, line: None, sleep=self.added.wait)
+        self.prober = ReadinessProber(timeout, self._on_ready)
+        self.ready = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _on_ready(self, instance_name, ready):
+        self.serving[instance_name] = time.time()
+        if self.on_ready:
+            self.on_ready(instance_name, ready)
+
+    def _watch(self, instance_name):
+        ip = get_external_ip(self.compute, self.project, self.zone, instance_name)
+        if ip:
+            self.prober.add(instance_name, f"http://{ip}:5000")
+        if self.boot_marker:
+            self.follower.follow(instance_name, [self.boot_marker])
+
+    def _run(self):
+        while True:
+            try:
+                # Block for the next clone only while no console is being followed
+                instance_name = self.queue.get(block=not self.follower.pending)
+            except queue.Empty:
+                self.added.clear()
+                if self.queue.empty():
+                    self.follower.tick()
+                continue
+            if instance_name is None:
+                break
+            try:
+                self._watch(instance_name)
+            except Exception as e:
+                print(f"  Could not watch {instance_name}: {e}")
+        self.added.clear()
+        self.follower.wait(self.timeout)
+
+    def add(self, instance_name):
+        """Start watching a clone whose insert is done."""
+        self.queue.put(instance_name)
+        self.added.set()
+
+    def wait(self):
+        """Wait for every boot marker and first HTTP 200, or the timeout.
+
+        Returns the time.perf_counter() reading at which each clone first
+        served, or None for the ones that never did.
+        """
+        if self.ready is None:
+            self.add(None)
+            self.thread.join()
+            self.ready = self.prober.wait()
+        return self.ready
+
+    @property
+    def booted(self):
+        """time.time() at which each clone's boot marker was seen."""
+        return {
+            instance_name: seen[self.boot_marker]
+            for instance_name, seen in self.follower.seen.items()
+            if self.boot_marker in seen
+        }
+
+def trace_lifecycle(compute, project, zone, instance_names, watcher):
+    """Record every phase of each clone's lifecycle and return the timelines.
+
+    Server timestamps come from the API. The boot marker and the first
+    HTTP 200 come from the CloneWatcher, which has been following each
+    clone's console and probing its port since its insert was done. Both
+    are seen by polling with backoff, so each can be late by up to
+    SERIAL_MAX_DELAY and PROBE_MAX_DELAY seconds respectively.
+    """
+    print(f"\nTracing the lifecycle of {len(instance_names)} clones...")
+    watcher.wait()
+    timelines = {}
+    for instance_name in instance_names:
+        timelines[instance_name], _ = get_server_events(compute, project, zone, instance_name)
+    for instance_name, booted in watcher.booted.items():
+        if instance_name in timelines:
+            timelines[instance_name]['booted'] = booted
+    for instance_name in instance_names:
+        if instance_name in watcher.serving:
+            timelines[instance_name]['serving'] = watcher.serving[instance_name]
+        else:
+            print(f"  {instance_name} not serving after {watcher.timeout} seconds")
+    return timelines
+
+def phase_durations(events):
+    """Return the seconds spent in each phase whose two events were both seen."""
+    return {
+        phase: events[end] - events[start]
+        for phase, (start, end) in LIFECYCLE_PHASES.items()
+        if start in events and end in events
+    }
+
+def print_timelines(timelines):
+    """Print each clone's events in seconds after its request was accepted."""
+    print(f"\n{'Instance':<25}" + "".join(f"{event:>10}" for event in LIFECYCLE_EVENTS))
+    for instance_name, events in timelines.items():
+        origin = events.get('accepted')
+        cells = [
+            f"{events[event] - origin:>10.1f}" if origin and event in events else f"{'-':>10}"
+            for event in LIFECYCLE_EVENTS
+        ]
+        print(f"{instance_name:<25}" + "".join(cells))
+
+def histogram(values, bins=HISTOGRAM_BINS, width=30):
+    """Return text histogram lines for values."""
+    low, high = min(values), max(values)
+    step = (high - low) / bins or 1.0
+    counts = [0] * bins
+    for value in values:
+        counts[min(int((value - low) / step), bins - 1)] += 1
+    most = max(counts)
+    return [
+        f"{low + i * step:8.1f} - {low + (i + 1) * step:8.1f} s | "
+        f"{'#' * round(count * width / most):<{width}} {count}"
+        for i, count in enumerate(counts)
+    ]
+
+# TIMING REPORT
+
+def load_timing_results(path):
+    """Load the timing results recorded by earlier runs, keyed by mode."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_timing_results(path, results):
+    """Save the timing results of every mode."""
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def sequential_seconds_per_clone(results):
+    """Return the sequential cost of one clone and whether it was estimated.
+
+    A recorded sequential run is used when there is one. Otherwise the mean
+    per-instance time of another run is what each clone would have cost
+    one after another; bulk runs only give a makespan, so they are the
+    last resort.
+    """
+    if 'sequential' in results:
+        run = results['sequential']
+        return run['makespan'] / len(run['timings']), False
+    run = results.get('concurrent') or next(iter(results.values()))
+    return sum(run['timings'].values()) / len(run['timings']), True
+
+def speedup(results, run):
+    """Return how many times faster a run was than creating its clones sequentially."""
+    per_clone, estimated = sequential_seconds_per_clone(results)
+    return per_clone * len(run['timings']) / run['makespan']
+
+def write_lifecycle_report(f, lifecycle):
+    """Write the per-instance timelines and per-phase histograms."""
+    f.write("## Lifecycle Phases\n\n")
+    f.write("Seconds after the insert request was accepted.\n\n")
+    f.write("| Instance | Mode | " + " | ".join(LIFECYCLE_EVENTS) + " |\n")
+    f.write("|----------|------|" + "|".join("-" * (len(event) + 2) for event in LIFECYCLE_EVENTS) + "|\n")
+    for record in lifecycle:
+        events = record['events']
+        origin = events.get('accepted')
+        cells = [
+            f"{events[event] - origin:.1f}" if origin and event in events else "-"
+            for event in LIFECYCLE_EVENTS
+        ]
+        f.write(f"| {record['instance']} | {record['mode']} | " + " | ".join(cells) + " |\n")
+
+    durations = collections.defaultdict(list)
+    for record in lifecycle:
+        for phase, seconds in phase_durations(record['events']).items():
+            durations[phase].append(seconds)
+    if not durations:
+        f.write("\n")
+        return
+
+    f.write("\n| Phase | n | Mean (seconds) | Max (seconds) | Share of end-to-end |\n")
+    f.write("|-------|---|----------------|---------------|---------------------|\n")
+    means = {phase: sum(values) / len(values) for phase, values in durations.items()}
+    total = sum(means.values())
+    for phase, values in durations.items():
+        share = f"{means[phase] / total:.0%}" if total > 0 else "-"
+        f.write(f"| {phase} | {len(values)} | {means[phase]:.2f} | {max(values):.2f} | {share} |\n")
+    slowest = max(means, key=means.get)
+    f.write(f"\nThe slowest phase on average is *{slowest}*. Booted and serving are seen by "
+            "polling that starts as soon as each clone's insert is done, with backoff, so they "
+            f"can be late by up to {SERIAL_MAX_DELAY:.0f} and {PROBE_MAX_DELAY:.0f} seconds "
+            "respectively.\n\n")
+
+    for phase, values in durations.items():
+        f.write(f"### {phase}\n\n```\n")
+        f.write("\n".join(histogram(values)) + "\n```\n\n")
+
+def write_timing_report(path, results, source_results=None, lifecycle=None):
+    """Write TIMING.md from the timing results of every recorded mode, source and lifecycle."""
+
+    with open(path, 'w') as f:
+        f.write("# Part 2 - Instance Creation Timing Results\n\n")
+        f.write(f"*Project:* {PROJECT_ID}\n")
+        f.write(f"*Zone:* {ZONE}\n")
+        f.write(f"*Machine Type:* {MACHINE_TYPE}\n")
+        f.write(f"*Source Snapshot:* {SNAPSHOT_NAME}\n\n")
+
+        for mode, run in results.items():
+            timings = run['timings']
+            f.write(f"## Timing Results ({mode})\n\n")
+            if mode == 'concurrent':
+                f.write(f"*Max concurrency:* {run['max_concurrency']}\n\n")
+            if mode == 'bulk':
+                f.write("*One bulkInsert operation:* every instance is ready when it is DONE\n\n")
+            if mode == 'mig':
+                f.write(f"*Managed instance group:* {GROUP_NAME} from template {TEMPLATE_NAME}, "
+                        "timed from resize until the group is stable\n\n")
+            serving = run.get('serving')
+            if serving is None:
+                f.write("| Instance Name | Creation Time (seconds) |\n")
+                f.write("|---------------|------------------------|\n")
+                for name, timing in timings.items():
+                    f.write(f"| {name} | {timing:.2f} |\n")
+            else:
+                f.write("| Instance Name | Creation Time (seconds) | Time to Serving (seconds) |\n")
+                f.write("|---------------|------------------------|---------------------------|\n")
+                for name, timing in timings.items():
+                    serve = f"{serving[name]:.2f}" if name in serving else "not serving"
+                    f.write(f"| {name} | {timing:.2f} | {serve} |\n")
+            f.write("\n### Statistics\n\n")
+            f.write(f"- *Average time:* {sum(timings.values())/len(timings):.2f} seconds\n")
+            f.write(f"- *Min time:* {min(timings.values()):.2f} seconds\n")
+            f.write(f"- *Max time:* {max(timings.values()):.2f} seconds\n")
+            f.write(f"- *Total makespan:* {run['makespan']:.2f} seconds\n")
+            if serving:
+                f.write(f"- *Average time to serving:* {sum(serving.values())/len(serving):.2f} seconds "
+                        f"({len(serving)}/{len(timings)} clones serving)\n")
+            f.write("\n")
+
+        if source_results:
+            f.write("## Clone Source Comparison\n\n")
+            f.write("| Source | Instance | Creation (seconds) | Time to serving (seconds) |\n")
+            f.write("|--------|----------|--------------------|---------------------------|\n")
+            for source, result in source_results.items():
+                serving = (f"{result['serving']:.2f}" if result['serving'] is not None
+                           else "not serving")
+                f.write(f"| {source} | {result['instance']} | {result['creation']:.2f} | {serving} |\n")
+            f.write("\nBoth times run from the first request for the clone; disk clones "
+                    "include copying the disk.\n\n")
+
+        if lifecycle:
+            write_lifecycle_report(f, lifecycle)
+
+        if results:
+            _, estimated = sequential_seconds_per_clone(results)
+            f.write("## Makespan Comparison\n\n")
+            f.write("| Mode | Clones | Makespan (seconds) | Seconds per clone | Speedup vs sequential |\n")
+            f.write("|------|--------|--------------------|-------------------|-----------------------|\n")
+            for mode, run in results.items():
+                f.write(f"| {mode} | {len(run['timings'])} | {run['makespan']:.2f} "
+                        f"| {run['makespan'] / len(run['timings']):.2f} "
+                        f"| {speedup(results, run):.2f}x |\n")
+            f.write("\nSpeedup compares each makespan with creating the same number of clones sequentially.\n")
+            if estimated:
+                f.write("No sequential run was recorded, so the sequential makespan is "
+                        "estimated from the mean per-instance creation time.\n")
+            f.write("\n")
+
+        f.write("## Notes\n\n")
+        f.write("Instances were created from a snapshot containing a fully installed Flask tutorial application, "
+                "started on boot by flaskr.service.\n")
+
+# Defining the main program
+
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Clone the Part 1 VM from a snapshot")
+    parser.add_argument('--mode', choices=['sequential', 'concurrent', 'bulk', 'mig'],
+                        default=CLONE_MODE,
+                        help="create clones one at a time, in parallel, with one bulkInsert, "
+                             "or by resizing a managed instance group")
+    parser.add_argument('--max-concurrency', type=int,
+                        help="clones in flight at once in concurrent mode (default: --num-clones)")
+    parser.add_argument('--num-clones', type=int, default=NUM_CLONES,
+                        help="number of clones to create")
+    parser.add_argument('--prefix', default=NEW_INSTANCE_PREFIX,
+                        help="name prefix of the clones")
+    parser.add_argument('--benchmark-sources', nargs='*', choices=CLONE_SOURCES, metavar='SOURCE',
+                        help="create one clone from each source (default: all of "
+                             f"{', '.join(CLONE_SOURCES)}) and time creation and serving")
+    parser.add_argument('--lifecycle', action='store_true',
+                        help="after creating the clones, time every phase until they serve on port 5000")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="do not wait for the clones to serve on port 5000")
+    parser.add_argument('--plan', action='store_true',
+                        help="print the steps without calling the API")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="forget cached image and snapshot selfLinks")
+    parser.add_argument('--inventory', action='store_true',
+                        help="list instances in every zone and exit")
+    parser.add_argument('--filter', dest='instance_filter',
+                        help="server-side filter for --inventory, e.g. 'labels.app = flask-tutorial'")
+    parser.add_argument('--status', help="only list instances with this status")
+    parser.add_argument('--label', help="only list instances with this KEY=VALUE label")
+    args = parser.parse_args()
+    if args.max_concurrency is None:
+        args.max_concurrency = args.num_clones
+    if args.max_concurrency < 1:
+        parser.error("--max-concurrency must be at least 1")
+    return args
+
+def print_plan(args):
+    """Print the steps main() would take."""
+    print(f"\nPlan:")
+    print(f"  1. Check that '{SOURCE_INSTANCE_NAME}' exists")
+    print(f"  2. Snapshot its boot disk as '{SNAPSHOT_NAME}' unless the snapshot exists")
+    if args.benchmark_sources is not None:
+        print(f"  3. Create one clone from each of {', '.join(args.benchmark_sources or CLONE_SOURCES)}")
+        print(f"     and time creation and time to serving on port 5000")
+    elif args.mode == 'mig':
+        print(f"  3. Make image '{IMAGE_NAME}' and template '{TEMPLATE_NAME}' from the snapshot,")
+        print(f"     then resize group '{GROUP_NAME}' to {args.num_clones} and wait until it is stable")
+    else:
+        names = clone_names(args.prefix, args.num_clones, args.mode)
+        print(f"  3. Create {names[0]}..{names[-1]} from the snapshot ({args.mode}"
+              + (f", up to {args.max_concurrency} at a time)" if args.mode == 'concurrent' else ")"))
+    if args.lifecycle and args.benchmark_sources is None:
+        print(f"  3a. Trace accepted, started, done, running, booted and serving for each clone")
+    results_file = SOURCE_RESULTS_FILE if args.benchmark_sources is not None else TIMING_RESULTS_FILE
+    print(f"  4. Write the timings to {results_file} and TIMING.md")
+    if args.benchmark_sources is None and not args.no_wait and not args.lifecycle:
+        print(f"  5. Wait until every clone answers on port 5000")
 
 def main():
     """Main function."""
+    args = parse_args()
     print("=" * 70)
     print("  Part 2: Clone a Machine from Snapshot")
     print("=" * 70)
@@ -236,7 +1146,21 @@ def main():
     print(f"Source Instance: {SOURCE_INSTANCE_NAME}")
     print(f"Snapshot Name: {SNAPSHOT_NAME}")
     
+    if args.inventory:
+        inventory = InstanceInventory.scan(get_compute(), PROJECT_ID, args.instance_filter)
+        print_inventory(inventory, status=args.status,
+                        label=tuple(args.label.split('=', 1)) if args.label else None)
+        return
+    
+    if args.plan:
+        print_plan(args)
+        return
+    
     try:
+        compute = get_compute()
+        if args.refresh_cache:
+            resource_cache.invalidate()
+        
         # Checking if source instance exists
         print(f"\nChecking if source instance '{SOURCE_INSTANCE_NAME}' exists...")
         if not instance_exists(compute, PROJECT_ID, ZONE, SOURCE_INSTANCE_NAME):
@@ -245,24 +1169,51 @@ def main():
             sys.exit(1)
         print(f"  Source instance found")
         
+        # A snapshot of a source that does not serve gives clones that do not serve either
+        if not snapshot_exists(compute, PROJECT_ID, SNAPSHOT_NAME):
+            check_source_serving(compute, PROJECT_ID, ZONE, SOURCE_INSTANCE_NAME)
+        
         # Creating snapshot
         create_snapshot(compute, PROJECT_ID, ZONE, SOURCE_INSTANCE_NAME, SNAPSHOT_NAME)
         
+        if args.benchmark_sources is not None:
+            sources = args.benchmark_sources or CLONE_SOURCES
+            print(f"\nStep 2: Benchmarking clone sources: {', '.join(sources)}...")
+            source_results = benchmark_clone_sources(
+                compute, PROJECT_ID, ZONE, sources, args.prefix, SNAPSHOT_NAME, MACHINE_TYPE
+            )
+            save_timing_results(SOURCE_RESULTS_FILE, source_results)
+            print(f"\n{'Source':<15} {'Creation (s)':>13} {'Serving (s)':>12}")
+            for source, result in source_results.items():
+                serving = f"{result['serving']:.2f}" if result['serving'] is not None else "-"
+                print(f"{source:<15} {result['creation']:>13.2f} {serving:>12}")
+            write_timing_report('TIMING.md', load_timing_results(TIMING_RESULTS_FILE),
+                                source_results, load_timing_results(LIFECYCLE_FILE))
+            print(f"\nClean up: gcloud compute instances delete "
+                  f"{' '.join(result['instance'] for result in source_results.values())} --zone={ZONE}")
+            if 'machine-image' in sources:
+                print(f"          gcloud compute machine-images delete {MACHINE_IMAGE_NAME}")
+            print_api_report()
+            return
+        
         # Creating cloned instances and measure timing
-        print(f"\nStep 2: Creating {NUM_CLONES} cloned instances...")
-        timings = []
-        instance_names = []
+        print(f"\nStep 2: Creating {args.num_clones} cloned instances ({args.mode})...")
+        instance_names = clone_names(args.prefix, args.num_clones, args.mode)
         
-        for i in range(1, NUM_CLONES + 1):
-            instance_name = f"{NEW_INSTANCE_PREFIX}-{i}"
-            instance_names.append(instance_name)
-            
-            print(f"\n--- Clone {i}/{NUM_CLONES} ---")
-            elapsed = create_instance_from_snapshot(
-                compute, PROJECT_ID, ZONE, instance_name,
-                SNAPSHOT_NAME, MACHINE_TYPE
+        # Each clone is probed, and traced, from the moment its own insert is done
+        watcher = None
+        if args.lifecycle or not args.no_wait:
+            watcher = CloneWatcher(
+                PROJECT_ID, ZONE, boot_marker=BOOT_MARKER if args.lifecycle else None,
+                on_ready=report_serving(clone_start_times)
             )
-            timings.append(elapsed)
+        
+        timings, makespan = create_clones(
+            compute, PROJECT_ID, ZONE, args.mode, instance_names, args.prefix,
+            SNAPSHOT_NAME, MACHINE_TYPE, args.max_concurrency,
+            on_created=watcher.add if watcher else None
+        )
+        instance_names = list(timings)
         
         # Displaying results
         print("\n" + "=" * 70)
@@ -272,52 +1223,80 @@ def main():
         print(f"\nTiming Results:")
         print(f"{'Instance Name':<25} {'Creation Time (seconds)':<25}")
         print("-" * 50)
-        for name, timing in zip(instance_names, timings):
+        for name, timing in timings.items():
             print(f"{name:<25} {timing:<25.2f}")
         
         print(f"\nStatistics:")
-        print(f"  Average time: {sum(timings)/len(timings):.2f} seconds")
-        print(f"  Min time: {min(timings):.2f} seconds")
-        print(f"  Max time: {max(timings):.2f} seconds")
+        print(f"  Average time: {sum(timings.values())/len(timings):.2f} seconds")
+        print(f"  Min time: {min(timings.values()):.2f} seconds")
+        print(f"  Max time: {max(timings.values()):.2f} seconds")
+        print(f"  Total makespan: {makespan:.2f} seconds")
         
-        # Listing all instances with IPs
+        lifecycle = load_timing_results(LIFECYCLE_FILE) or []
+        if args.lifecycle:
+            timelines = trace_lifecycle(compute, PROJECT_ID, ZONE, instance_names, watcher)
+            print_timelines(timelines)
+            lifecycle += [
+                {'instance': name, 'mode': args.mode, 'events': events}
+                for name, events in timelines.items()
+            ]
+            save_timing_results(LIFECYCLE_FILE, lifecycle)
+        
+        # Listing all instances with IPs, from one aggregatedList scan instead of a get per clone
         print(f"\nInstance URLs:")
+        inventory = InstanceInventory.scan(compute, PROJECT_ID, "labels.part = part2")
+        urls = {}
         for name in instance_names:
-            ip = get_external_ip(compute, PROJECT_ID, ZONE, name)
-            if ip:
-                print(f"  {name}: http://{ip}:5000")
+            record = inventory.get(name, ZONE)
+            if record and record['ip']:
+                urls[name] = f"http://{record['ip']}:5000"
+                print(f"  {name}: {urls[name]}")
         
-        # Creating TIMING.md file
-        print(f"\nCreating TIMING.md file...")
-        with open('TIMING.md', 'w') as f:
-            f.write("# Part 2 - Instance Creation Timing Results\n\n")
-            f.write(f"*Project:* {PROJECT_ID}\n")
-            f.write(f"*Zone:* {ZONE}\n")
-            f.write(f"*Machine Type:* {MACHINE_TYPE}\n")
-            f.write(f"*Source Snapshot:* {SNAPSHOT_NAME}\n\n")
-            f.write("## Timing Results\n\n")
-            f.write("| Instance Name | Creation Time (seconds) |\n")
-            f.write("|---------------|------------------------|\n")
-            for name, timing in zip(instance_names, timings):
-                f.write(f"| {name} | {timing:.2f} |\n")
-            f.write("\n## Statistics\n\n")
-            f.write(f"- *Average time:* {sum(timings)/len(timings):.2f} seconds\n")
-            f.write(f"- *Min time:* {min(timings):.2f} seconds\n")
-            f.write(f"- *Max time:* {max(timings):.2f} seconds\n")
-            f.write("\n## Notes\n\n")
-            f.write("Instances were created from a snapshot containing a fully installed Flask tutorial application.\n")
+        # flaskr.service starts Flask on boot, so each clone is timed from its request until it serves
+        serving = None
+        if watcher and not args.no_wait:
+            print(f"\nWaiting up to {SERVING_TIMEOUT} seconds for the clones to serve...")
+            serving = wait_for_serving(watcher, clone_start_times)
+            print(f"  {len(serving)}/{len(instance_names)} clones serving")
+        
+        # Recording this run next to the other modes and creating TIMING.md
+        results = load_timing_results(TIMING_RESULTS_FILE)
+        results[args.mode] = {
+            'timings': timings,
+            'makespan': makespan,
+        }
+        if args.mode == 'concurrent':
+            results[args.mode]['max_concurrency'] = args.max_concurrency
+        if serving is not None:
+            results[args.mode]['serving'] = serving
+        save_timing_results(TIMING_RESULTS_FILE, results)
+        
+        _, estimated = sequential_seconds_per_clone(results)
+        print(f"  Speedup vs sequential: {speedup(results, results[args.mode]):.2f}x"
+              f"{' (estimated)' if estimated else ''}")
         
+        print(f"\nCreating TIMING.md file...")
+        write_timing_report('TIMING.md', results, load_timing_results(SOURCE_RESULTS_FILE),
+                            lifecycle)
         print("  TIMING.md created")
         
         print("\nYour running instances:")
-        instances = list_instances(compute, PROJECT_ID, ZONE)
-        if instances:
-            for instance in instances:
-                print(f"   - {instance['name']}")
+        for instance in list_instances(compute, PROJECT_ID, ZONE,
+                                       instance_filter='status = RUNNING'):
+            print(f"   - {instance['name']}")
         
+        print(f"\nOperation polls: {sum(operation_polls.values())} API calls "
+              f"across {len(operation_polls)} operations")
+        print(f"Resource cache: {resource_cache.hits} hits, {resource_cache.misses} misses")
+        print_api_report()
         print("\n" + "=" * 70)
         print("\nIMPORTANT: Clean up when done!")
-        print(f"Delete instances: gcloud compute instances delete {' '.join(instance_names)} --zone={ZONE}")
+        if args.mode == 'mig':
+            print(f"Delete group: gcloud compute instance-groups managed delete {GROUP_NAME} --zone={ZONE}")
+            print(f"Delete template: gcloud compute instance-templates delete {TEMPLATE_NAME}")
+            print(f"Delete image: gcloud compute images delete {IMAGE_NAME}")
+        else:
+            print(f"Delete instances: gcloud compute instances delete {' '.join(instance_names)} --zone={ZONE}")
         print(f"Delete snapshot: gcloud compute snapshots delete {SNAPSHOT_NAME}")
         print(f"Keep source instance: {SOURCE_INSTANCE_NAME} (needed for reference)")
         print("=" * 70)
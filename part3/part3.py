@@ -1,9 +1,30 @@
 #!/usr/bin/env python3
 
+import argparse
+import hashlib
+import json
+import os
 import sys
+import random
+import tempfile
 import time
-import googleapiclient.discovery
-from google.oauth2 import service_account
+import uuid
+import zipapp
+import googleapiclient.errors
+
+# The helpers shared by all three parts live in compute_common.py at the top of the repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import compute_common
+from compute_common import (
+    SERVING_TIMEOUT, BOOTSTRAP_PHASES, SERVER_START_TIMEOUT, OPERATION_TIMEOUT,
+    POLL_INITIAL_DELAY, POLL_MAX_DELAY, CACHE_DIR, FLASK_SERVICE_SCRIPT,
+    PHASE_TIMING_SCRIPT, print_api_report, build_instance_spec, resource_cache,
+    operation_polls, wait_for_operation, wait_until_ready, SerialLogFollower,
+    instance_exists, get_image_from_family, wsgi_sizing, render_startup_script,
+    get_guest_attributes, get_bootstrap_phases
+)
+# The metadata bundle and VM naming are shared with the launcher, which is stdlib-only
+from vm1_launcher import build_metadata_bundle, bundle_metadata, vm_names
 
 # Defining configuration 
 
@@ -15,66 +36,108 @@ VM2_NAME = "vm2-flask-app"
 MACHINE_TYPE = "f1-micro"
 IMAGE_FAMILY = "ubuntu-2204-lts"
 IMAGE_PROJECT = "ubuntu-os-cloud"
-
-# Loading service account credentials
-print("Loading service account credentials...")
-try:
-    credentials = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE,
-        scopes=['https://www.googleapis.com/auth/cloud-platform']
-    )
-    print(f"Service account credentials loaded successfully")
-except FileNotFoundError:
-    print(f"Error: Service account file '{SERVICE_ACCOUNT_FILE}' not found!")
-    print("Please create a service account and download the JSON key file.")
-    sys.exit(1)
-
-print(f"Project ID: {PROJECT_ID}")
-
-# Building compute service
-compute = googleapiclient.discovery.build('compute', 'v1', credentials=credentials)
-
+VM1_LABELS = {'app': 'flask-tutorial', 'part': 'part3', 'role': 'launcher'}
+SERVING_MODE = "wsgi"  # "wsgi" runs gunicorn sized to MACHINE_TYPE, "dev" the flask run development server
+VM1_DONE_MARKER = "VM-1 Startup Complete"  # VM-1 startup script line once VM-2 is launched
+VM2_DONE_MARKER = "Installation Complete"  # VM-2 startup script line once Flask is running
+GOLDEN_IMAGE_FAMILY = "flask-tutorial-golden"  # Family baked by part1 --bake
+LAUNCHER_MODE = "bundle"  # "bundle" ships VM-1 the prebuilt stdlib launcher, "pip" installs the Google client at boot
+LAUNCHER_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vm1_launcher.py")
+LAUNCH_RESULTS_FILE = "launch_results.json"  # VM-2 launch latency by launcher mode
+VM2_COUNT = 1  # VM-2s each launcher creates
+VM2_CONCURRENCY = 8  # Inserts each launcher keeps in flight at once
+FANOUT_DEPTH = 0  # Levels of launchers below VM-1 that create VM-2s in turn
+FANOUT_NAMESPACE = "fanout"  # Guest attribute namespace the launchers publish creation throughput in
+LAUNCHER_SERVICE_PORT = 8080  # Port the launcher service on VM-1 listens on, on localhost only
+TRACE_NAMESPACE = "trace"  # Guest attribute namespace each hop publishes its epoch timestamps in
+TRACE_FILE = "trace.json"  # Hop timings of the last traced run
+TRACE_WIDTH = 50  # Characters of the waterfall's time axis
+# Hops of the VM-creates-VM chain, as (name, start event, end event); the
+# driver records the VM-1 insert, the VMs publish the rest as guest attributes
+TRACE_HOPS = [
+    ("driver inserts VM-1", 'vm1-insert', 'vm1-done'),
+    ("VM-1 boots", 'vm1-done', 'vm1-boot'),
+    ("VM-1 packages ready", 'vm1-boot', 'vm1-ready'),
+    ("VM-1 inserts VM-2", 'vm2-insert-start', 'vm2-insert-done'),
+    ("VM-2 boots", 'vm2-insert-done', 'vm2-boot'),
+    ("VM-2 serves Flask", 'vm2-boot', 'vm2-serving'),
+]
 
 # Defining the VM-2 startup script
 
-VM2_STARTUP_SCRIPT = """#!/bin/bash
+VM2_STARTUP_SCRIPT = f"""#!/bin/bash
 set -e
 exec > >(tee -a /var/log/vm2-startup.log)
 exec 2>&1
-
+{PHASE_TIMING_SCRIPT}
 echo "=== VM-2 Flask Installation Started at $(date) ==="
 
+# Publish the trace ID and boot time for the driver's hop trace
+TRACE_ATTRIBUTES=http://metadata.google.internal/computeMetadata/v1/instance/guest-attributes/{TRACE_NAMESPACE}
+trace_id=$(curl -sf -H "Metadata-Flavor: Google" http://metadata.google.internal/computeMetadata/v1/instance/attributes/trace-id || true)
+curl -s -X PUT --data "$trace_id" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/id || true
+curl -s -X PUT --data "$bootstrap_start" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm2-boot || true
+
 # Create working directory
 mkdir -p /opt/flask-app
 cd /opt/flask-app
 
 # Update and install dependencies
 apt-get update
+end_phase apt-update
 apt-get install -y python3 python3-pip git
+end_phase apt-install
 
 # Clone Flask tutorial
 git clone https://github.com/cu-csci-4253-datacenter/flask-tutorial
+end_phase git-clone
 cd flask-tutorial
 
 # Install Flask tutorial
 python3 setup.py install
 pip3 install -e .
+end_phase pip-install
 
 # Setup and run Flask
 export FLASK_APP=flaskr
 flask init-db
+end_phase init-db
 
 # Start Flask application
-nohup flask run -h 0.0.0.0 > /var/log/flask.log 2>&1 &
+{FLASK_SERVICE_SCRIPT}systemctl enable --now flaskr.service
+timeout {SERVER_START_TIMEOUT} bash -c 'until curl -s -o /dev/null http://localhost:5000/; do sleep 0.5; done' &&
+    curl -s -X PUT --data "$(date +%s.%N)" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm2-serving || true
+end_phase server-start
+phase_start=$bootstrap_start
+end_phase total
 
 echo "=== VM-2 Flask Installation Complete at $(date) ==="
 """
 
+# Defining the VM-2 start step used with the golden image, where the app is already installed
+
+VM2_START_SCRIPT = f"""#!/bin/bash
+vm2_boot=$(date +%s.%N)
+# flaskr.service is enabled in the image and normally already started
+systemctl start flaskr.service
+
+# Publish the trace ID, boot time and serving time for the driver's hop trace
+TRACE_ATTRIBUTES=http://metadata.google.internal/computeMetadata/v1/instance/guest-attributes/{TRACE_NAMESPACE}
+trace_id=$(curl -sf -H "Metadata-Flavor: Google" http://metadata.google.internal/computeMetadata/v1/instance/attributes/trace-id || true)
+curl -s -X PUT --data "$trace_id" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/id || true
+curl -s -X PUT --data "$vm2_boot" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm2-boot || true
+timeout {SERVER_START_TIMEOUT} bash -c 'until curl -s -o /dev/null http://localhost:5000/; do sleep 0.5; done' &&
+    curl -s -X PUT --data "$(date +%s.%N)" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm2-serving || true
+echo "=== VM-2 Flask Installation Complete at $(date) ==="
+"""
+
 # Defining VM-1 Python script
 
 VM1_LAUNCH_SCRIPT = f"""#!/usr/bin/env python3
+import random
 import time
 import googleapiclient.discovery
+from googleapiclient.errors import HttpError
 from google.oauth2 import service_account
 
 # Get metadata
@@ -106,20 +169,22 @@ with open('/srv/vm2-startup-script.sh', 'r') as f:
 with open('/srv/config.txt', 'r') as f:
     config = {{}}
     for line in f:
-        key, value = line.strip().split('=')
+        key, value = line.strip().split('=', 1)
         config[key] = value
 
 zone = config['ZONE']
 vm2_name = config['VM2_NAME']
 machine_type = config['MACHINE_TYPE']
 
-# Get image
-image_response = compute.images().getFromFamily(
-    project='{IMAGE_PROJECT}',
-    family='{IMAGE_FAMILY}'
-).execute()
-
-source_disk_image = image_response['selfLink']
+# Get image, the driver passes the one it already resolved
+if 'SOURCE_IMAGE' in config:
+    source_disk_image = config['SOURCE_IMAGE']
+else:
+    source_disk_image = compute.images().getFromFamily(
+        project='{IMAGE_PROJECT}',
+        family='{IMAGE_FAMILY}',
+        fields='selfLink'
+    ).execute()['selfLink']
 machine_type_url = f"zones/{{zone}}/machineTypes/{{machine_type}}"
 
 # Create VM-2 configuration
@@ -145,6 +210,12 @@ vm2_config = {{
         'items': [{{
             'key': 'startup-script',
             'value': vm2_startup_script
+        }}, {{
+            'key': 'enable-guest-attributes',
+            'value': 'TRUE'
+        }}, {{
+            'key': 'trace-id',
+            'value': config.get('TRACE_ID', '')
         }}]
     }},
     'tags': {{
@@ -153,38 +224,64 @@ vm2_config = {{
 }}
 
 print(f"VM-1: Launching VM-2 '{{vm2_name}}'...")
+insert_start = time.time()
 operation = compute.instances().insert(
     project=project,
     zone=zone,
     body=vm2_config
 ).execute()
 
-# Wait for operation
+# Wait for operation using the server-side long poll, backing off on operations.get
+# if the wait endpoint fails
 print(f"VM-1: Waiting for VM-2 creation to complete...")
+deadline = time.monotonic() + {OPERATION_TIMEOUT}
+delay = {POLL_INITIAL_DELAY}
+use_wait = True
+polls = 0
 while True:
-    result = compute.zoneOperations().get(
-        project=project,
-        zone=zone,
-        operation=operation['name']
-    ).execute()
+    polls += 1
+    operations = compute.zoneOperations()
+    try:
+        request = operations.wait if use_wait else operations.get
+        result = request(
+            project=project,
+            zone=zone,
+            operation=operation['name'],
+            fields='status,error'
+        ).execute()
+    except HttpError:
+        if not use_wait:
+            raise
+        use_wait = False
+        continue
     
     if result['status'] == 'DONE':
         if 'error' in result:
             print(f"VM-1: Error creating VM-2: {{result['error']}}")
         else:
-            print(f"VM-1: VM-2 '{{vm2_name}}' created successfully!")
+            print(f"VM-1: VM-2 '{{vm2_name}}' created successfully ({{polls}} API calls)!")
+            # Publish the insert's timestamps for the driver's hop trace
+            for key, value in [(f'insert-start-{{vm2_name}}', insert_start),
+                               (f'insert-done-{{vm2_name}}', time.time())]:
+                requests.put(f'{{metadata_server}}/instance/guest-attributes/{TRACE_NAMESPACE}/{{key}}',
+                             data=str(value), headers=metadata_flavor)
         break
-    time.sleep(2)
+    if time.monotonic() > deadline:
+        raise TimeoutError("VM-2 creation did not finish in time")
+    if not use_wait:
+        time.sleep(delay / 2 + random.uniform(0, delay / 2))
+        delay = min(delay * 2, {POLL_MAX_DELAY})
 
 # Get VM-2 external IP
 instance = compute.instances().get(
     project=project,
     zone=zone,
-    instance=vm2_name
+    instance=vm2_name,
+    fields='networkInterfaces/accessConfigs/natIP'
 ).execute()
 
 external_ip = None
-for interface in instance['networkInterfaces']:
+for interface in instance.get('networkInterfaces', []):
     if 'accessConfigs' in interface:
         for access_config in interface['accessConfigs']:
             if 'natIP' in access_config:
@@ -213,6 +310,7 @@ VM1_STARTUP_SCRIPT = """#!/bin/bash
 set -e
 exec > >(tee -a /var/log/vm1-startup.log)
 exec 2>&1
+vm1_boot=$(date +%s.%N)
 
 echo "=== VM-1 Startup Started at $(date) ==="
 
@@ -237,6 +335,12 @@ apt-get update
 apt-get install -y python3 python3-pip
 pip3 install --upgrade google-api-python-client google-auth-httplib2 google-auth-oauthlib
 
+# Publish the trace ID, boot time and package readiness for the driver's hop trace
+TRACE_ATTRIBUTES=http://metadata.google.internal/computeMetadata/v1/instance/guest-attributes/trace
+curl -s -X PUT --data "$(sed -n 's/^TRACE_ID=//p' /srv/config.txt)" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/id || true
+curl -s -X PUT --data "$vm1_boot" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm1-boot || true
+curl -s -X PUT --data "$(date +%s.%N)" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm1-ready || true
+
 # Run the script to create VM-2
 echo "Launching VM-2 creation script..."
 python3 /srv/vm1-launch-script.py
@@ -244,39 +348,376 @@ python3 /srv/vm1-launch-script.py
 echo "=== VM-1 Startup Complete at $(date) ==="
 """
 
-# Defining Helper functions
+# Setting up the VM-1 startup script for the prebuilt launcher bundle, which
+# needs only the python3 and openssl the image ships with
 
-# Defining the wait opeartion
-def wait_for_operation(compute, project, zone, operation):
-    """Wait for a zone operation to complete."""
-    print(f"  Waiting for operation to complete...")
-    while True:
-        result = compute.zoneOperations().get(
-            project=project,
-            zone=zone,
-            operation=operation
-        ).execute()
+VM1_BUNDLE_STARTUP_SCRIPT = """#!/bin/bash
+set -e
+exec > >(tee -a /var/log/vm1-startup.log)
+exec 2>&1
+vm1_boot=$(date +%s.%N)
+
+echo "=== VM-1 Startup Started at $(date) ==="
+
+# Create working directory
+mkdir -p /srv
+cd /srv
 
-        if result['status'] == 'DONE':
-            if 'error' in result:
-                raise Exception(result['error'])
-            print(f"  Operation completed")
-            return result
-        time.sleep(1)
-
-# Getting image from family
-def get_image_from_family(compute, image_project, family):
-    """Get the latest image from a family."""
-    image_response = compute.images().getFromFamily(
-        project=image_project,
-        family=family
+# Fetch every metadata attribute in one request, check the bundle's hash and
+# unpack it, unless this exact bundle is already unpacked
+echo "Downloading metadata bundle..."
+python3 - <<'PY'
+import base64, hashlib, io, json, os, tarfile, urllib.request
+request = urllib.request.Request(
+    "http://metadata.google.internal/computeMetadata/v1/instance/attributes/?recursive=true",
+    headers={"Metadata-Flavor": "Google"})
+with urllib.request.urlopen(request, timeout=10) as response:
+    attributes = json.load(response)
+digest = attributes["bundle-sha256"]
+marker = "/srv/.bundle-sha256"
+if os.path.exists(marker) and open(marker).read() == digest:
+    print(f"Bundle {digest[:12]} already unpacked")
+else:
+    chunks = int(attributes["bundle-chunks"])
+    archive = base64.b64decode("".join(attributes[f"bundle-{i}"] for i in range(chunks)))
+    if hashlib.sha256(archive).hexdigest() != digest:
+        raise SystemExit(f"Bundle does not match its hash {digest}")
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall("/srv")
+    with open(marker, "w") as f:
+        f.write(digest)
+    print(f"Unpacked bundle {digest[:12]}: {len(archive)} bytes in {chunks} chunks")
+PY
+
+# Publish the trace ID, boot time and package readiness for the driver's hop trace
+TRACE_ATTRIBUTES=http://metadata.google.internal/computeMetadata/v1/instance/guest-attributes/trace
+curl -s -X PUT --data "$(sed -n 's/^TRACE_ID=//p' /srv/config.txt)" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/id || true
+curl -s -X PUT --data "$vm1_boot" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm1-boot || true
+curl -s -X PUT --data "$(date +%s.%N)" -H "Metadata-Flavor: Google" $TRACE_ATTRIBUTES/vm1-ready || true
+
+# Keep the launcher running as a service with a warm client for later jobs, installed
+# first so that a failed one-shot run below does not leave VM-1 without it
+cat > /etc/systemd/system/vm1-launcher.service <<UNIT
+[Unit]
+Description=VM-1 launcher service
+After=network-online.target
+Wants=network-online.target
+
+[Service]
+ExecStart=/usr/bin/python3 /srv/vm1-launcher.pyz serve
+Restart=on-failure
+StandardOutput=append:/var/log/vm1-launcher.log
+StandardError=append:/var/log/vm1-launcher.log
+
+[Install]
+WantedBy=multi-user.target
+UNIT
+systemctl daemon-reload
+systemctl enable vm1-launcher.service
+systemctl restart vm1-launcher.service
+
+# Run the launcher to create VM-2; VMs that already exist are skipped, so a re-run is safe
+echo "Launching VM-2 creation script..."
+python3 /srv/vm1-launcher.pyz
+
+echo "=== VM-1 Startup Complete at $(date) ==="
+"""
+
+# Defining Helper functions
+
+# Defining the lazily built compute client
+def get_credentials():
+    """Load the service account credentials."""
+    from google.oauth2 import service_account
+    print("Loading service account credentials...")
+    try:
+        credentials = service_account.Credentials.from_service_account_file(
+            SERVICE_ACCOUNT_FILE,
+            scopes=['https://www.googleapis.com/auth/cloud-platform']
+        )
+        print(f"Service account credentials loaded successfully")
+    except FileNotFoundError:
+        print(f"Error: Service account file '{SERVICE_ACCOUNT_FILE}' not found!")
+        print("Please create a service account and download the JSON key file.")
+        sys.exit(1)
+    return credentials
+
+def get_compute():
+    """Build the compute client on first use."""
+    return compute_common.get_compute(get_credentials)
+
+# Waiting for VM-1 to create VM-2
+def wait_for_external_ip(compute, project, zone, instance_name, timeout=OPERATION_TIMEOUT):
+    """Poll with backoff until the instance exists with an external IP, and return the IP.
+
+    VM-2 is created by VM-1, so it does not exist at first; a 404 just
+    means VM-1 has not got that far yet. Returns None on timeout.
+    """
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_DELAY
+    while time.monotonic() < deadline:
+        try:
+            instance = compute.instances().get(
+                project=project,
+                zone=zone,
+                instance=instance_name,
+                fields='networkInterfaces/accessConfigs/natIP'
+            ).execute()
+            for interface in instance.get('networkInterfaces', []):
+                for access_config in interface.get('accessConfigs', []):
+                    if 'natIP' in access_config:
+                        return access_config['natIP']
+        except googleapiclient.errors.HttpError as e:
+            if e.resp.status != 404:
+                raise
+        time.sleep(delay / 2 + random.uniform(0, delay / 2))
+        delay = min(delay * 2, POLL_MAX_DELAY)
+    return None
+
+# Tracing the hops of the VM-creates-VM chain
+def collect_trace(compute, trace_id, events):
+    """Add the timestamps VM-1 and VM-2 published for trace_id to events, and return the hops.
+
+    events starts with the driver's own wall clock readings. Timestamps
+    published under another trace ID are left out, as they belong to an
+    earlier run.
+    """
+    published = {}
+    for instance_name in [VM1_NAME, VM2_NAME]:
+        response = get_guest_attributes(compute, PROJECT_ID, ZONE, instance_name, TRACE_NAMESPACE)
+        values = {item['key']: item['value'] for item in response.get('queryValue', {}).get('items', [])}
+        if values.pop('id', None) != trace_id:
+            print(f"  {instance_name} has not published trace {trace_id}")
+            continue
+        published.update({key: float(value) for key, value in values.items() if value})
+    published['vm2-insert-start'] = published.pop(f"insert-start-{VM2_NAME}", None)
+    published['vm2-insert-done'] = published.pop(f"insert-done-{VM2_NAME}", None)
+    # VM-2's own serving time replaces the driver's probe, which stands in when it is missing
+    events.update({key: value for key, value in published.items() if value is not None})
+
+    hops = []
+    for name, start, end in TRACE_HOPS:
+        if start in events and end in events:
+            hops.append({'hop': name, 'start': events[start], 'seconds': events[end] - events[start]})
+        else:
+            hops.append({'hop': name, 'start': None, 'seconds': None})
+    return hops
+
+def print_waterfall(trace_id, events, hops):
+    """Print the hops as a waterfall on a time axis starting at the VM-1 insert."""
+    origin = events['vm1-insert']
+    end = max(hop['start'] + hop['seconds'] for hop in hops if hop['seconds'] is not None)
+    scale = TRACE_WIDTH / max(end - origin, 1e-9)
+    print(f"\nHop trace {trace_id} (seconds from the VM-1 insert):")
+    print(f"  {'Hop':<22} {'Start':>7} {'Seconds':>8}")
+    for hop in hops:
+        if hop['seconds'] is None:
+            print(f"  {hop['hop']:<22} {'-':>7} {'-':>8}")
+            continue
+        offset = max(0, int((hop['start'] - origin) * scale))
+        bar = '#' * max(1, round(hop['seconds'] * scale))
+        print(f"  {hop['hop']:<22} {hop['start'] - origin:>7.1f} {hop['seconds']:>8.1f}  {' ' * offset}{bar}")
+    measured = [hop for hop in hops if hop['seconds'] is not None]
+    slowest = max(measured, key=lambda hop: hop['seconds'])
+    print(f"  {'end to end':<22} {'':>7} {end - origin:>8.1f}")
+    print(f"  Slowest hop: {slowest['hop']} ({slowest['seconds']:.1f} seconds)")
+    print(f"  Timestamps come from each machine's clock, so hops across machines include clock skew")
+
+# Building the VM-1 launcher bundle
+def build_launcher_bundle():
+    """Return (version, bytes) of the VM-1 launcher zipapp, built once per version.
+
+    The version is a hash of vm1_launcher.py, and the built archive is kept
+    in CACHE_DIR, so later runs reuse it until the launcher changes.
+    """
+    with open(LAUNCHER_SOURCE, 'rb') as f:
+        source = f.read()
+    version = hashlib.sha256(source).hexdigest()[:12]
+    path = os.path.join(CACHE_DIR, f"vm1-launcher-{version}.pyz")
+    if not os.path.exists(path):
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with tempfile.TemporaryDirectory() as build_dir:
+            with open(os.path.join(build_dir, '__main__.py'), 'wb') as f:
+                f.write(source)
+            zipapp.create_archive(build_dir, f"{path}.tmp", interpreter='/usr/bin/env python3',
+                                  compressed=True)
+        os.replace(f"{path}.tmp", path)
+    with open(path, 'rb') as f:
+        return version, f.read()
+
+def update_vm1_bundle(compute, vm1_config, digest):
+    """Push a changed bundle to an existing VM-1, and return whether it changed.
+
+    The bundle hash is kept in a label, so the check reads a few bytes
+    instead of the whole metadata.
+    """
+    instance = compute.instances().get(
+        project=PROJECT_ID,
+        zone=ZONE,
+        instance=VM1_NAME,
+        fields='labels,labelFingerprint,metadata/fingerprint'
     ).execute()
-    return image_response['selfLink']
+    if instance.get('labels', {}).get('bundle') == vm1_config['labels']['bundle']:
+        return False
+    operations = [
+        compute.instances().setMetadata(
+            project=PROJECT_ID,
+            zone=ZONE,
+            instance=VM1_NAME,
+            body=dict(vm1_config['metadata'], fingerprint=instance['metadata']['fingerprint'])
+        ).execute(),
+        compute.instances().setLabels(
+            project=PROJECT_ID,
+            zone=ZONE,
+            instance=VM1_NAME,
+            body={'labels': vm1_config['labels'], 'labelFingerprint': instance['labelFingerprint']}
+        ).execute(),
+    ]
+    for operation in operations:
+        wait_for_operation(compute, PROJECT_ID, ZONE, operation['name'])
+    return True
+
+# Recording the VM-2 launch latency of each launcher mode
+def record_launch_latency(launcher, seconds):
+    """Save the launch latency of a launcher mode and print it next to the other mode's."""
+    results = {}
+    if os.path.exists(LAUNCH_RESULTS_FILE):
+        with open(LAUNCH_RESULTS_FILE) as f:
+            results = json.load(f)
+    results[launcher] = {'seconds': seconds, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    with open(LAUNCH_RESULTS_FILE, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\n  {'Launcher':<10} {'VM-1 insert to VM-2 IP (s)':>28}")
+    for mode in ['pip', 'bundle']:
+        if mode in results:
+            print(f"  {mode:<10} {results[mode]['seconds']:>28.2f}")
+    if 'pip' in results and 'bundle' in results:
+        print(f"  The bundle launches VM-2 {results['pip']['seconds'] - results['bundle']['seconds']:.2f} "
+              f"seconds sooner")
+    else:
+        other = 'pip' if launcher == 'bundle' else 'bundle'
+        print(f"  Run with --launcher {other} to compare")
+
+# Naming the VMs of a launcher tree the way vm1_launcher.py does
+def fanout_names(prefix, count, depth):
+    """Return the names of the VM-2s at the bottom of a launcher tree."""
+    names = vm_names(prefix, count)
+    if depth == 0:
+        return names
+    return [leaf for name in names for leaf in fanout_names(f"{name}-vm", count, depth - 1)]
+
+# Waiting for a launcher tree
+def wait_for_fleet(compute, args, leaves, launch_start):
+    """Wait until every VM-2 of a launcher tree serves, and report the creation throughput."""
+    print(f"\nWaiting for the launchers to create {len(leaves)} VM-2s...")
+    deadline = time.monotonic() + OPERATION_TIMEOUT * (args.fanout_depth + 1)
+    ips = {}
+    for name in leaves:
+        ip = wait_for_external_ip(compute, PROJECT_ID, ZONE, name, timeout=max(0, deadline - time.monotonic()))
+        if ip is not None:
+            ips[name] = ip
+    fleet_seconds = time.perf_counter() - launch_start
+    print(f"  {len(ips)} of {len(leaves)} VM-2s have an IP {fleet_seconds:.2f} seconds after VM-1 "
+          f"was requested ({len(ips) / fleet_seconds * 60:.1f} VMs per minute end to end)")
+
+    # Each launcher publishes what it measured itself, from its first insert to its last DONE
+    launchers = [VM1_NAME] + (fanout_names(VM2_NAME, args.count, 0) if args.fanout_depth else [])
+    print(f"\n  {'Launcher':<30} {'Created':>8} {'Makespan (s)':>13} {'VMs/minute':>11}")
+    for name in launchers:
+        result = get_bootstrap_phases(compute, PROJECT_ID, ZONE, name, namespace=FANOUT_NAMESPACE)
+        if 'throughput' in result:
+            print(f"  {name:<30} {result['created']:>8.0f} {result['makespan']:>13.2f} "
+                  f"{result['throughput']:>11.1f}")
+        else:
+            print(f"  {name:<30} {'-':>8} {'-':>13} {'-':>11}")
+    print(f"  Compare with part2 --mode concurrent, which creates clones from this machine")
+
+    if ips:
+        print(f"\nWaiting up to {SERVING_TIMEOUT} seconds for the VM-2s to serve...")
+        ready = wait_until_ready({name: f"http://{ip}:5000" for name, ip in ips.items()})
+        serving = [at for at in ready.values() if at is not None]
+        print(f"  {len(serving)} of {len(leaves)} VM-2s serving"
+              + (f", the last {max(serving) - launch_start:.2f} seconds after VM-1 was requested" if serving else ""))
+    print(f"\nClean up: gcloud compute instances delete {VM1_NAME} "
+          f"{' '.join(launchers[1:] + leaves)} --zone={ZONE}")
 
 # MAIN FUNCTION
 
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def parse_args():
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Create a VM that creates the Flask VM")
+    parser.add_argument('--golden', action='store_true',
+                        help=f"create VM-2 from the latest {GOLDEN_IMAGE_FAMILY} image (part1 --bake)")
+    parser.add_argument('--serving', choices=['wsgi', 'dev'], default=SERVING_MODE,
+                        help="run flaskr on VM-2 under gunicorn sized to MACHINE_TYPE, or the flask development server")
+    parser.add_argument('--launcher', choices=['bundle', 'pip'], default=LAUNCHER_MODE,
+                        help="ship VM-1 the prebuilt launcher bundle, or pip-install the Google client at boot")
+    parser.add_argument('--count', type=positive_int, default=VM2_COUNT,
+                        help="VM-2s each launcher creates")
+    parser.add_argument('--concurrency', type=positive_int, default=VM2_CONCURRENCY,
+                        help="inserts each launcher keeps in flight at once")
+    parser.add_argument('--fanout-depth', type=int, choices=[0, 1], default=FANOUT_DEPTH,
+                        help="1 makes the VMs VM-1 creates launchers that each create --count VM-2s")
+    parser.add_argument('--follow', action='store_true',
+                        help="stream the startup output of VM-1 and VM-2 from their serial consoles")
+    parser.add_argument('--no-wait', action='store_true',
+                        help="exit once VM-1 exists instead of waiting for VM-2 to serve")
+    parser.add_argument('--plan', action='store_true',
+                        help="print the steps without calling the API")
+    parser.add_argument('--refresh-cache', action='store_true',
+                        help="forget cached image and snapshot selfLinks")
+    args = parser.parse_args()
+    if args.launcher == 'pip' and (args.count > 1 or args.fanout_depth):
+        parser.error("--count and --fanout-depth need the bundle launcher")
+    return args
+
+def print_plan(args):
+    """Print the steps main() would take."""
+    print(f"\nPlan:")
+    print(f"  1. Read the service credentials from '{SERVICE_ACCOUNT_FILE}'")
+    if args.launcher == 'bundle':
+        print(f"  2. Create VM-1 '{VM1_NAME}' with the launcher, VM-2 startup script, credentials")
+        print(f"     and config in one compressed metadata bundle, or upload the bundle to an")
+        print(f"     existing VM-1 if its hash changed")
+    else:
+        print(f"  2. Create VM-1 '{VM1_NAME}' with the launch script, VM-2 startup script,")
+        print(f"     credentials and config in its metadata")
+    leaves = fanout_names(VM2_NAME, args.count, args.fanout_depth)
+    if args.fanout_depth:
+        print(f"  3. VM-1 runs the prebuilt launcher bundle and creates {args.count} launchers,")
+        print(f"     which create {args.count} VM-2s each, {args.concurrency} at a time ({len(leaves)} VM-2s)")
+    elif args.count > 1:
+        print(f"  3. VM-1 runs the prebuilt launcher bundle and creates {args.count} VM-2s "
+              f"'{leaves[0]}'..., {args.concurrency} at a time")
+    elif args.launcher == 'bundle':
+        print(f"  3. VM-1 runs the prebuilt launcher bundle from its metadata and creates VM-2 '{VM2_NAME}'")
+    else:
+        print(f"  3. VM-1 installs the Google API client and creates VM-2 '{VM2_NAME}'")
+    if args.golden:
+        print(f"  4. VM-2 boots the latest {GOLDEN_IMAGE_FAMILY} image and starts the Flask tutorial")
+    else:
+        print(f"  4. VM-2 installs and starts the Flask tutorial")
+    if len(leaves) > 1:
+        print(f"  5. Wait until every VM-2 has an IP and http://IP:5000 answers, and report")
+        print(f"     the creation throughput the launchers measured")
+    else:
+        print(f"  5. Wait until VM-2 has an IP and http://IP:5000 answers, recording the")
+        print(f"     launch latency in {LAUNCH_RESULTS_FILE} and tracing every hop from the")
+        print(f"     VM-1 insert to VM-2 serving into a waterfall")
+    if args.launcher == 'bundle':
+        print(f"  6. VM-1 keeps a launcher service on port {LAUNCHER_SERVICE_PORT} for later create and delete jobs")
+
 def main():
     """Main function to create VM-1."""
+    args = parse_args()
     print("=" * 70)
     print("  Part 3: VM Creating VM")
     print("=" * 70)
@@ -285,54 +726,96 @@ def main():
     print(f"VM-1 (Launcher): {VM1_NAME}")
     print(f"VM-2 (Flask App): {VM2_NAME}")
     
+    if args.plan:
+        print_plan(args)
+        return
+    
     try:
+        compute = get_compute()
+        if args.refresh_cache:
+            resource_cache.invalidate()
+        
         # Reading service credentials file
         print("\nReading service credentials...")
         with open(SERVICE_ACCOUNT_FILE, 'r') as f:
             service_creds_content = f.read()
         print("Service credentials file read successfully")
         
-        # Creating config file content
-        config_content = f"ZONE={ZONE}\nVM2_NAME={VM2_NAME}\nMACHINE_TYPE={MACHINE_TYPE}\n"
-        
-        # Get the image for VM-1
+        # Get the image for VM-1, VM-2 uses the same one
         print("\nFetching Ubuntu image...")
         source_disk_image = get_image_from_family(compute, IMAGE_PROJECT, IMAGE_FAMILY)
-        machine_type_url = f"zones/{ZONE}/machineTypes/{MACHINE_TYPE}"
+        
+        # VM-2 boots the golden image and only starts the app, or installs it from scratch
+        vm2_image = source_disk_image
+        vm2_script = render_startup_script(
+            VM2_STARTUP_SCRIPT, args.serving, *wsgi_sizing(compute, PROJECT_ID, ZONE, MACHINE_TYPE)
+        )
+        if args.golden:
+            vm2_image = get_image_from_family(compute, PROJECT_ID, GOLDEN_IMAGE_FAMILY)
+            vm2_script = VM2_START_SCRIPT
+        
+        # A new VM-1 starts a new trace; an existing one only gets its bundle checked
+        vm1_exists = args.launcher == 'bundle' and instance_exists(compute, PROJECT_ID, ZONE, VM1_NAME)
+        trace_id = None if vm1_exists else uuid.uuid4().hex[:16]
+        
+        # Creating config file content
+        config_content = (f"ZONE={ZONE}\nVM2_NAME={VM2_NAME}\nMACHINE_TYPE={MACHINE_TYPE}\n"
+                          f"SOURCE_IMAGE={vm2_image}\nIMAGE_PROJECT={IMAGE_PROJECT}\n"
+                          f"IMAGE_FAMILY={IMAGE_FAMILY}\nVM2_COUNT={args.count}\n"
+                          f"VM2_CONCURRENCY={args.concurrency}\nFANOUT_DEPTH={args.fanout_depth}\n"
+                          f"SERVICE_PORT={LAUNCHER_SERVICE_PORT}\n")
+        if trace_id:
+            config_content += f"TRACE_ID={trace_id}\n"
         print("Ubuntu image retrieved")
         
+        # VM-1 either runs the prebuilt launcher from one bundle with all its files,
+        # or gets them as separate keys and installs the Google client at boot
+        labels = dict(VM1_LABELS)
+        if args.launcher == 'bundle':
+            version, launcher = build_launcher_bundle()
+            digest, archive = build_metadata_bundle({
+                'vm2-startup-script.sh': vm2_script.encode(),
+                'service-credentials.json': service_creds_content.encode(),
+                'config.txt': config_content.encode(),
+                'vm1-launcher.pyz': launcher,
+            })
+            metadata = {'startup-script': VM1_BUNDLE_STARTUP_SCRIPT, 'enable-guest-attributes': 'TRUE'}
+            metadata.update(bundle_metadata(digest, archive))
+            labels['bundle'] = digest[:32]
+            print(f"Metadata bundle {digest[:12]}: {len(archive)} bytes compressed, "
+                  f"launcher {version}, {metadata['bundle-chunks']} chunks")
+        else:
+            metadata = {
+                'startup-script': VM1_STARTUP_SCRIPT,
+                'vm2-startup-script': vm2_script,
+                'vm1-launch-script': VM1_LAUNCH_SCRIPT,
+                'service-credentials': service_creds_content,
+                'config': config_content,
+                'enable-guest-attributes': 'TRUE'
+            }
+        
         # Creating VM-1 configuration
         print(f"\nCreating VM-1 '{VM1_NAME}'...")
-        vm1_config = {
-            'name': VM1_NAME,
-            'machineType': machine_type_url,
-            'disks': [{
-                'boot': True,
-                'autoDelete': True,
-                'initializeParams': {
-                    'sourceImage': source_disk_image,
-                    'diskSizeGb': 10
-                }
-            }],
-            'networkInterfaces': [{
-                'network': f'projects/{PROJECT_ID}/global/networks/default',
-                'accessConfigs': [{
-                    'type': 'ONE_TO_ONE_NAT',
-                    'name': 'External NAT'
-                }]
-            }],
-            'metadata': {
-                'items': [
-                    {'key': 'startup-script', 'value': VM1_STARTUP_SCRIPT},
-                    {'key': 'vm2-startup-script', 'value': VM2_STARTUP_SCRIPT},
-                    {'key': 'vm1-launch-script', 'value': VM1_LAUNCH_SCRIPT},
-                    {'key': 'service-credentials', 'value': service_creds_content},
-                    {'key': 'config', 'value': config_content}
-                ]
-            }
-        }
+        vm1_config = build_instance_spec(
+            PROJECT_ID, ZONE, VM1_NAME, MACHINE_TYPE,
+            source_image=source_disk_image,
+            metadata=metadata,
+            labels=labels
+        )
         
-        # Creating VM-1
+        # An existing VM-1 only gets the bundle again if it changed
+        if vm1_exists:
+            if update_vm1_bundle(compute, vm1_config, digest):
+                print(f"VM-1 '{VM1_NAME}' already exists, uploaded the changed bundle {digest[:12]}")
+                print(f"To unpack it and run it:")
+                print(f"  gcloud compute ssh {VM1_NAME} --zone={ZONE} -- sudo google_metadata_script_runner startup")
+            else:
+                print(f"VM-1 '{VM1_NAME}' already exists with bundle {digest[:12]}, nothing to upload")
+            return
+        
+        # Creating VM-1, on the wall clock too so the trace lines up with the VMs' timestamps
+        launch_start = time.perf_counter()
+        trace_events = {'vm1-insert': time.time()}
         operation = compute.instances().insert(
             project=PROJECT_ID,
             zone=ZONE,
@@ -340,6 +823,7 @@ def main():
         ).execute()
         
         wait_for_operation(compute, PROJECT_ID, ZONE, operation['name'])
+        trace_events['vm1-done'] = time.time()
         print(f"VM-1 '{VM1_NAME}' created successfully!")
         
         # Get the VM-1 external IP
@@ -347,11 +831,12 @@ def main():
         instance = compute.instances().get(
             project=PROJECT_ID,
             zone=ZONE,
-            instance=VM1_NAME
+            instance=VM1_NAME,
+            fields='networkInterfaces/accessConfigs/natIP'
         ).execute()
         
         vm1_ip = None
-        for interface in instance['networkInterfaces']:
+        for interface in instance.get('networkInterfaces', []):
             if 'accessConfigs' in interface:
                 for access_config in interface['accessConfigs']:
                     if 'natIP' in access_config:
@@ -364,19 +849,71 @@ def main():
         print(f"VM-1 IP: {vm1_ip}")
         print(f"\nVM-1 is now creating VM-2 '{VM2_NAME}'...")
         print(f"This will take 2-3 minutes.")
-        print(f"\nTo monitor progress:")
-        print(f"  gcloud compute ssh {VM1_NAME} --zone={ZONE}")
-        print(f"  sudo tail -f /var/log/vm1-startup.log")
+        print(f"\nTo monitor progress (or run with --follow to stream both VMs):")
+        print(f"  gcloud compute instances get-serial-port-output {VM1_NAME} --zone={ZONE}")
         print(f"\nTo check VM-2 creation results:")
         print(f"  gcloud compute ssh {VM1_NAME} --zone={ZONE}")
         print(f"  cat /srv/vm2-results.txt")
+        if args.launcher == 'bundle':
+            print(f"\nTo create or delete more VMs through VM-1's warm launcher service:")
+            print(f"  gcloud compute ssh {VM1_NAME} --zone={ZONE} -- "
+                  f"python3 /srv/vm1-launcher.pyz submit create {VM2_NAME}-extra --wait")
+            print(f"  gcloud compute ssh {VM1_NAME} --zone={ZONE} -- python3 /srv/vm1-launcher.pyz stats")
         print(f"\nTo find VM-2's IP after creation:")
         print(f"  gcloud compute instances list")
-        print(f"\nExpected timeline:")
-        print(f"  - VM-1 setup: 2-3 minutes")
-        print(f"  - VM-2 creation: 1-2 minutes")
-        print(f"  - VM-2 Flask app: 2-3 minutes")
-        print(f"  - Total: 5-8 minutes")
+        print(f"\nTrace ID: {trace_id}")
+        print(f"  Each hop from the VM-1 insert to VM-2 serving is timed and printed as a")
+        print(f"  waterfall once VM-2 serves" + (", run without --no-wait to see it" if args.no_wait else ""))
+        
+        leaves = fanout_names(VM2_NAME, args.count, args.fanout_depth)
+        if args.follow:
+            print(f"\nFollowing the serial consoles of VM-1 and VM-2...")
+            follower = SerialLogFollower(compute, PROJECT_ID, ZONE)
+            follower.follow(VM1_NAME, [VM1_DONE_MARKER])
+            for name in leaves:
+                follower.follow(name, [VM2_DONE_MARKER])
+            follower.wait(OPERATION_TIMEOUT * (args.fanout_depth + 1) + SERVING_TIMEOUT)
+            for name in follower.pending:
+                print(f"  {name} did not finish its startup script in time")
+        
+        if not args.no_wait and len(leaves) > 1:
+            wait_for_fleet(compute, args, leaves, launch_start)
+        elif not args.no_wait:
+            print(f"\nWaiting for VM-1 to create VM-2...")
+            probe_start = time.perf_counter()
+            vm2_ip = wait_for_external_ip(compute, PROJECT_ID, ZONE, VM2_NAME)
+            if vm2_ip is None:
+                print(f"  VM-2 did not appear within {OPERATION_TIMEOUT} seconds")
+            else:
+                launch_seconds = time.perf_counter() - launch_start
+                print(f"  VM-2 IP {vm2_ip} after {time.perf_counter() - probe_start:.2f} seconds, "
+                      f"{launch_seconds:.2f} seconds after VM-1 was requested")
+                record_launch_latency(args.launcher, launch_seconds)
+                print(f"Waiting up to {SERVING_TIMEOUT} seconds for http://{vm2_ip}:5000...")
+                ready = wait_until_ready({VM2_NAME: f"http://{vm2_ip}:5000"})[VM2_NAME]
+                if ready is None:
+                    print(f"  VM-2 is not serving yet")
+                else:
+                    print(f"  VM-2 serving {ready - probe_start:.2f} seconds after VM-1 was created")
+                    trace_events['vm2-serving'] = time.time() - (time.perf_counter() - ready)
+                    phases = get_bootstrap_phases(compute, PROJECT_ID, ZONE, VM2_NAME)
+                    if phases:
+                        print(f"\nVM-2 bootstrap phases (seconds):")
+                        for phase in BOOTSTRAP_PHASES + ['total']:
+                            if phase in phases:
+                                print(f"  {phase:<14} {phases[phase]:>8.1f}")
+                
+                # Whatever hops were reached are shown, so a stuck run still points at its slow hop
+                hops = collect_trace(compute, trace_id, trace_events)
+                if any(hop['seconds'] is not None for hop in hops):
+                    print_waterfall(trace_id, trace_events, hops)
+                    with open(TRACE_FILE, 'w') as f:
+                        json.dump({'trace_id': trace_id, 'events': trace_events, 'hops': hops}, f, indent=2)
+                    print(f"  Saved to {TRACE_FILE}")
+        print(f"\nOperation polls: {sum(operation_polls.values())} API calls "
+              f"across {len(operation_polls)} operations")
+        print(f"Resource cache: {resource_cache.hits} hits, {resource_cache.misses} misses")
+        print_api_report()
         print("\n" + "=" * 70)
         
     except Exception as e:
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""Checks that part3 and the VM-1 launcher agree on VM names and bundles."""
+
+import unittest
+
+import part3
+import vm1_launcher
+
+
+class LauncherAgreementTest(unittest.TestCase):
+    def test_fanout_names_match_launcher(self):
+        for count in (1, 2, 3):
+            self.assertEqual(part3.fanout_names("vm2", count, 0),
+                             vm1_launcher.vm_names("vm2", count))
+            # Each launcher names its children after itself with a -vm suffix
+            leaves = [leaf for name in vm1_launcher.vm_names("vm2", count)
+                      for leaf in vm1_launcher.vm_names(f"{name}-vm", count)]
+            self.assertEqual(part3.fanout_names("vm2", count, 1), leaves)
+
+    def test_bundle_hash_matches_launcher(self):
+        files = {name: f"contents of {name}\n".encode() for name in vm1_launcher.BUNDLE_FILES}
+        digest, archive = part3.build_metadata_bundle(files)
+        self.assertEqual(vm1_launcher.build_metadata_bundle(dict(files)), (digest, archive))
+        self.assertEqual(part3.bundle_metadata(digest, archive),
+                         vm1_launcher.bundle_metadata(digest, archive))
+
+    def test_oversized_bundle_is_rejected(self):
+        with self.assertRaises(ValueError):
+            vm1_launcher.bundle_metadata("0" * 64, b"x" * vm1_launcher.METADATA_TOTAL_LIMIT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+
+# VM-1 launcher that needs nothing but the Python standard library.
+#
+# part3 bundles this file into a zipapp and ships it to VM-1 in metadata, so
+# VM-1 can create VM-2 as soon as it boots, without apt-get or pip. It talks
+# to the Compute REST API over kept-alive HTTPS connections and signs the
+# service account JWT with the openssl binary that is part of the base image.
+#
+# config.txt sets how many VM-2s to create (VM2_COUNT) and how many inserts
+# may be in flight at once (VM2_CONCURRENCY). With FANOUT_DEPTH above 0 the
+# VMs it creates are launchers themselves, booted with this VM's own
+# metadata, and each creates VM2_COUNT VMs in turn. Their files reach them
+# in one metadata bundle, packed the way part3 packs VM-1's.
+#
+# Usage:
+#   vm1-launcher.pyz                          create the VM-2s in config.txt once
+#   vm1-launcher.pyz serve                    run the launcher service
+#   vm1-launcher.pyz submit ACTION NAME       queue a create or delete job with the service
+#   vm1-launcher.pyz stats                    print the service's queue depth and job latencies
+
+import argparse
+import base64
+import gzip
+import hashlib
+import http.client
+import http.server
+import io
+import json
+import os
+import queue
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+
+METADATA_SERVER = "http://metadata.google.internal/computeMetadata/v1"
+METADATA_HEADERS = {'Metadata-Flavor': 'Google'}
+FANOUT_NAMESPACE = "fanout"  # Guest attribute namespace the creation throughput is published in
+TRACE_NAMESPACE = "trace"  # Guest attribute namespace the insert timestamps of a traced run are published in
+COMPUTE_HOST = "compute.googleapis.com"
+SCOPE = "https://www.googleapis.com/auth/cloud-platform"
+SRV_DIR = "/srv"
+BUNDLE_FILES = ["vm2-startup-script.sh", "service-credentials.json", "config.txt", "vm1-launcher.pyz"]
+METADATA_CHUNK_SIZE = 256 * 1024 - 1024  # Characters per metadata value, under the 256 KB limit
+SECRET_BUNDLE_FILES = {"service-credentials.json"}  # Bundle files only root may read
+METADATA_TOTAL_LIMIT = 512 * 1024  # Bytes of metadata one instance may carry
+OPERATION_TIMEOUT = 600
+POLL_INITIAL_DELAY = 1.0
+POLL_MAX_DELAY = 3.0  # Longest backoff between polls, so a DONE is seen within a few seconds
+TOKEN_REFRESH_MARGIN = 300  # Seconds before expiry the cached access token is renewed
+SERVICE_ADDRESS = "127.0.0.1"  # Address the launcher service listens on, see SERVICE_ADDRESS in config.txt
+SERVICE_PORT = 8080
+SERVICE_HISTORY = 100  # Finished jobs the service keeps for /stats
+INSTANCE_NAME_PATTERN = re.compile(r"[a-z]([-a-z0-9]{0,61}[a-z0-9])?")  # RFC 1035 names GCE accepts
+
+def log(message):
+    print(f"VM-1: {message}", flush=True)
+
+def base64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+def sign_rs256(private_key, message):
+    """Sign message with an RSA private key in PEM form using openssl."""
+    with tempfile.NamedTemporaryFile('w', suffix='.pem') as key_file:
+        os.chmod(key_file.name, 0o600)
+        key_file.write(private_key)
+        key_file.flush()
+        return subprocess.run(
+            ['openssl', 'dgst', '-sha256', '-sign', key_file.name],
+            input=message, capture_output=True, check=True
+        ).stdout
+
+def get_access_token(credentials):
+    """Exchange a signed service account JWT for (access token, seconds until it expires)."""
+    now = int(time.time())
+    header = base64url(json.dumps({'alg': 'RS256', 'typ': 'JWT'}).encode())
+    claims = base64url(json.dumps({
+        'iss': credentials['client_email'],
+        'scope': SCOPE,
+        'aud': credentials['token_uri'],
+        'iat': now,
+        'exp': now + 3600,
+    }).encode())
+    signing_input = f"{header}.{claims}".encode()
+    assertion = f"{header}.{claims}.{base64url(sign_rs256(credentials['private_key'], signing_input))}"
+    body = urllib.parse.urlencode({
+        'grant_type': 'urn:ietf:params:oauth:grant-type:jwt-bearer',
+        'assertion': assertion,
+    }).encode()
+    with urllib.request.urlopen(credentials['token_uri'], body, timeout=30) as response:
+        token = json.load(response)
+    return token['access_token'], token.get('expires_in', 3600)
+
+class AccessToken:
+    """Caches the access token and renews it TOKEN_REFRESH_MARGIN seconds before it expires."""
+
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.lock = threading.Lock()
+        self.token = None
+        self.expires = 0
+
+    def get(self):
+        with self.lock:
+            if time.monotonic() > self.expires - TOKEN_REFRESH_MARGIN:
+                self.token, expires_in = get_access_token(self.credentials)
+                self.expires = time.monotonic() + expires_in
+            return self.token
+
+class ApiError(Exception):
+    """A Compute API request answered with an HTTP error status.
+
+    retried is set when the answer came to the request's second send, after
+    the connection dropped during the first one.
+    """
+
+    def __init__(self, status, body, retried=False):
+        super().__init__(f"HTTP {status}: {body[:500]}")
+        self.status = status
+        self.retried = retried
+
+class AlreadyExists(Exception):
+    """An insert answered 409 because a VM of that name was there before it."""
+
+class Compute:
+    """Just enough of the Compute REST API to create and delete VMs.
+
+    Every thread keeps its own HTTPS connection open between requests, so
+    only the first request of a thread pays for the TLS handshake.
+    """
+
+    def __init__(self, tokens, project):
+        self.tokens = tokens
+        self.project = project
+        self.connections = threading.local()
+
+    def connection(self, fresh=False):
+        if fresh or getattr(self.connections, 'conn', None) is None:
+            self.connections.conn = http.client.HTTPSConnection(COMPUTE_HOST, timeout=150)
+        return self.connections.conn
+
+    def call(self, method, path, body=None, project=None, **params):
+        url = f"/compute/v1/projects/{project or self.project}/{path}"
+        if params:
+            url += '?' + urllib.parse.urlencode(params)
+        headers = {'Authorization': f"Bearer {self.tokens.get()}", 'Content-Type': 'application/json'}
+        data = json.dumps(body).encode() if body is not None else None
+        retried = False
+        try:
+            conn = self.connection()
+            conn.request(method, url, body=data, headers=headers)
+            response = conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            # The server closed the idle connection, open a new one once. The
+            # first send may still have reached the server, so callers of
+            # non-idempotent requests check ApiError.retried.
+            conn = self.connection(fresh=True)
+            conn.request(method, url, body=data, headers=headers)
+            response = conn.getresponse()
+            retried = True
+        payload = response.read()
+        if response.status >= 400:
+            raise ApiError(response.status, payload.decode(errors='replace'), retried)
+        return json.loads(payload) if payload else {}
+
+class OperationWaiter:
+    """Waits for every pending zone operation from one thread.
+
+    Callers register an operation and get a Future back. Pending operations
+    are polled with get in turn, with jittered exponential backoff between
+    rounds that resets when a new operation arrives. The wait endpoint is
+    not used: it blocks the thread for up to two minutes on one operation,
+    and the service can register more at any time.
+    """
+
+    def __init__(self, compute, zone):
+        self.compute = compute
+        self.zone = zone
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.polls = 0
+        threading.Thread(target=self.run, daemon=True).start()
+
+    def register(self, operation):
+        future = Future()
+        with self.lock:
+            self.pending[operation] = (future, time.monotonic() + OPERATION_TIMEOUT)
+        self.wakeup.set()
+        return future
+
+    def poll(self, operation):
+        return self.compute.call('GET', f"zones/{self.zone}/operations/{operation}",
+                                 fields='status,error')
+
+    def run(self):
+        delay = POLL_INITIAL_DELAY
+        while True:
+            with self.lock:
+                pending = dict(self.pending)
+            if not pending:
+                self.wakeup.wait()
+                self.wakeup.clear()
+                delay = POLL_INITIAL_DELAY
+                continue
+            for operation, (future, deadline) in pending.items():
+                self.polls += 1
+                try:
+                    result = self.poll(operation)
+                    if result['status'] != 'DONE' and time.monotonic() > deadline:
+                        raise TimeoutError(f"Operation {operation} not done after {OPERATION_TIMEOUT} seconds")
+                except Exception as e:
+                    result = None
+                    future.set_exception(e)
+                if result is None or result['status'] == 'DONE':
+                    with self.lock:
+                        del self.pending[operation]
+                    if result is not None:
+                        future.set_result(result)
+            # A new registration cuts the backoff short
+            if self.wakeup.wait(delay / 2 + random.uniform(0, delay / 2)):
+                delay = POLL_INITIAL_DELAY
+            else:
+                delay = min(delay * 2, POLL_MAX_DELAY)
+            self.wakeup.clear()
+
+def metadata_get(path):
+    request = urllib.request.Request(f"{METADATA_SERVER}/{path}", headers=METADATA_HEADERS)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read().decode()
+
+def publish(key, value, namespace=FANOUT_NAMESPACE):
+    """Publish a result as a guest attribute for the driver, if guest attributes are enabled."""
+    request = urllib.request.Request(
+        f"{METADATA_SERVER}/instance/guest-attributes/{namespace}/{key}",
+        data=str(value).encode(), method='PUT', headers=METADATA_HEADERS
+    )
+    try:
+        urllib.request.urlopen(request, timeout=10).close()
+    except OSError:
+        pass
+
+def vm_names(prefix, count):
+    """Return the names of the VMs one launcher creates."""
+    if count == 1:
+        return [prefix]
+    return [f"{prefix}-{i + 1}" for i in range(count)]
+
+def format_config(config):
+    return ''.join(f"{key}={value}\n" for key, value in config.items())
+
+def build_metadata_bundle(files):
+    """Return (sha256, bytes) of a gzipped tar of files, {name: bytes}.
+
+    Entries are sorted and carry no timestamps or owners, so the same files
+    always give the same bytes and the same hash.
+    """
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as compressed:
+        with tarfile.open(fileobj=compressed, mode='w') as tar:
+            for name in sorted(files):
+                info = tarfile.TarInfo(name)
+                info.size = len(files[name])
+                # Only the key is secret; the rest must stay readable for the ssh user's submit and stats
+                info.mode = 0o600 if name in SECRET_BUNDLE_FILES else 0o644
+                tar.addfile(info, io.BytesIO(files[name]))
+    archive = buffer.getvalue()
+    return hashlib.sha256(archive).hexdigest(), archive
+
+def bundle_metadata(digest, archive):
+    """Return the metadata items that carry a bundle in base64 chunks under the value size limit."""
+    encoded = base64.b64encode(archive).decode()
+    if len(encoded) > METADATA_TOTAL_LIMIT - 16 * 1024:
+        raise ValueError(f"Bundle of {len(encoded)} base64 bytes does not fit in instance metadata")
+    chunks = [encoded[i:i + METADATA_CHUNK_SIZE] for i in range(0, len(encoded), METADATA_CHUNK_SIZE)]
+    metadata = {'bundle-sha256': digest, 'bundle-chunks': str(len(chunks))}
+    for i, chunk in enumerate(chunks):
+        metadata[f"bundle-{i}"] = chunk
+    return metadata
+
+def read_config(path):
+    config = {}
+    with open(path) as f:
+        for line in f:
+            if '=' in line:
+                key, value = line.strip().split('=', 1)
+                config[key] = value
+    return config
+
+class Launcher:
+    """The project, config, authenticated client and operation waiter VM creation needs.
+
+    Built once per process: the one-shot run uses it for the VMs in
+    config.txt, and the service keeps it warm for every job after that.
+    """
+
+    def __init__(self):
+        self.project = metadata_get("project/project-id")
+        with open(os.path.join(SRV_DIR, 'service-credentials.json')) as f:
+            credentials = json.load(f)
+        with open(os.path.join(SRV_DIR, 'vm2-startup-script.sh')) as f:
+            self.vm2_startup_script = f.read()
+        self.config = read_config(os.path.join(SRV_DIR, 'config.txt'))
+        self.zone = self.config['ZONE']
+        self.depth = int(self.config.get('FANOUT_DEPTH', 0))
+        self.compute = Compute(AccessToken(credentials), self.project)
+        self.waiter = OperationWaiter(self.compute, self.zone)
+        self.startup_script = None
+
+        # Get image, the driver passes the one it already resolved
+        self.source_disk_image = self.config.get('SOURCE_IMAGE') or self.compute.call(
+            'GET', f"global/images/family/{self.config['IMAGE_FAMILY']}",
+            project=self.config['IMAGE_PROJECT'], fields='selfLink'
+        )['selfLink']
+
+    def metadata_for(self, name, depth, trace_id):
+        """Leaves run the Flask startup script; launchers boot with this VM's own
+        startup script and files, with a config for the next level down."""
+        if depth == 0:
+            return {'startup-script': self.vm2_startup_script, 'enable-guest-attributes': 'TRUE',
+                    'trace-id': trace_id}
+        if self.startup_script is None:
+            self.startup_script = metadata_get("instance/attributes/startup-script")
+        files = {}
+        for file_name in BUNDLE_FILES:
+            with open(os.path.join(SRV_DIR, file_name), 'rb') as f:
+                files[file_name] = f.read()
+        child_config = dict(self.config, VM2_NAME=f"{name}-vm", FANOUT_DEPTH=depth - 1)
+        files['config.txt'] = format_config(child_config).encode()
+        metadata = {'startup-script': self.startup_script, 'enable-guest-attributes': 'TRUE'}
+        metadata.update(bundle_metadata(*build_metadata_bundle(files)))
+        return metadata
+
+    def vm_config(self, name, depth, trace_id):
+        return {
+            'name': name,
+            'machineType': f"zones/{self.zone}/machineTypes/{self.config['MACHINE_TYPE']}",
+            'disks': [{
+                'boot': True,
+                'autoDelete': True,
+                'initializeParams': {'sourceImage': self.source_disk_image, 'diskSizeGb': 10}
+            }],
+            'networkInterfaces': [{
+                'network': f"projects/{self.project}/global/networks/default",
+                'accessConfigs': [{'type': 'ONE_TO_ONE_NAT', 'name': 'External NAT'}]
+            }],
+            'metadata': {'items': [{'key': key, 'value': value}
+                                   for key, value in self.metadata_for(name, depth, trace_id).items()]},
+            'tags': {'items': ['allow-5000']}
+        }
+
+    def wait(self, operation):
+        result = self.waiter.register(operation['name']).result()
+        if 'error' in result:
+            raise RuntimeError(result['error'])
+
+    def insert(self, name, depth, trace_id):
+        """Send the insert of one VM and return its operation.
+
+        An insert resent after a dropped connection answers 409 when the
+        first send got through. The VM is then ours, so the insert
+        operation already creating it is returned instead. A 409 on the
+        first send raises AlreadyExists.
+        """
+        try:
+            return self.compute.call('POST', f"zones/{self.zone}/instances",
+                                     self.vm_config(name, depth, trace_id))
+        except ApiError as e:
+            if e.status != 409:
+                raise
+            if not e.retried:
+                raise AlreadyExists(f"'{name}' already exists") from e
+        instance = self.compute.call('GET', f"zones/{self.zone}/instances/{name}", fields='id')
+        operations = self.compute.call(
+            'GET', f"zones/{self.zone}/operations",
+            filter=f"(targetId = {instance['id']}) AND (operationType = insert)",
+            fields='items(name)'
+        ).get('items', [])
+        if not operations:
+            raise RuntimeError(f"'{name}' exists but its insert operation was not found")
+        return operations[0]
+
+    def create(self, name, depth=0, trace_id=None):
+        """Insert one VM, wait for it, and return the seconds from insert to DONE.
+
+        The VM is tagged with trace_id, by default the TRACE_ID of the
+        driver's run in config.txt. Only for that trace are the wall clock
+        times of the insert and of DONE published on this VM, for the
+        driver's hop trace; service jobs pass a trace ID of their own so
+        they never show up in it.
+        """
+        boot_trace = trace_id is None
+        if boot_trace:
+            trace_id = self.config.get('TRACE_ID', '')
+        start = time.monotonic()
+        started_at = time.time()
+        self.wait(self.insert(name, depth, trace_id))
+        if boot_trace and trace_id:
+            publish(f"insert-start-{name}", f"{started_at:.3f}", TRACE_NAMESPACE)
+            publish(f"insert-done-{name}", f"{time.time():.3f}", TRACE_NAMESPACE)
+        return time.monotonic() - start
+
+    def delete(self, name):
+        """Delete one VM, wait for it, and return the seconds from delete to DONE."""
+        start = time.monotonic()
+        self.wait(self.compute.call('DELETE', f"zones/{self.zone}/instances/{name}"))
+        return time.monotonic() - start
+
+    def external_ip(self, name):
+        instance = self.compute.call('GET', f"zones/{self.zone}/instances/{name}",
+                                     fields='networkInterfaces/accessConfigs/natIP')
+        for interface in instance.get('networkInterfaces', []):
+            for access_config in interface.get('accessConfigs', []):
+                if 'natIP' in access_config:
+                    return access_config['natIP']
+        return None
+
+def run_once():
+    """Create the VMs config.txt asks for and write vm2-results.txt."""
+    start = time.monotonic()
+    launcher = Launcher()
+    log(f"Creating VM-2 in project {launcher.project}")
+    count = int(launcher.config.get('VM2_COUNT', 1))
+    concurrency = int(launcher.config.get('VM2_CONCURRENCY', count))
+    depth = launcher.depth
+    names = vm_names(launcher.config['VM2_NAME'], count)
+
+    role = f"launchers ({depth} levels below)" if depth else "VM-2s"
+    log(f"Launching {count} {role}, {concurrency} at a time "
+        f"({time.monotonic() - start:.2f} seconds after start)...")
+    launch_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {name: pool.submit(launcher.create, name, depth) for name in names}
+    makespan = time.monotonic() - launch_start
+
+    timings = {}
+    skipped = []
+    for name, future in futures.items():
+        try:
+            timings[name] = future.result()
+            log(f"'{name}' created in {timings[name]:.2f} seconds")
+        except AlreadyExists:
+            # A re-run of the startup script, e.g. after a bundle update, finds its VMs there
+            skipped.append(name)
+            log(f"'{name}' already exists, skipping")
+        except Exception as e:
+            log(f"Error creating '{name}': {e}")
+    if len(skipped) == count:
+        # Keep the results and guest attributes of the run that created them
+        log(f"Job complete in {time.monotonic() - start:.2f} seconds, nothing to create")
+        return
+    throughput = len(timings) / makespan * 60
+    log(f"Created {len(timings)} of {count} in {makespan:.2f} seconds "
+        f"({throughput:.1f} VMs per minute, {launcher.waiter.polls} operation polls)")
+
+    with open(os.path.join(SRV_DIR, 'vm2-results.txt'), 'w') as f:
+        f.write(f"VM-2s created: {len(timings)} of {count}\n")
+        for name, seconds in timings.items():
+            external_ip = launcher.external_ip(name)
+            log(f"'{name}' external IP: {external_ip}")
+            f.write(f"VM-2 Name: {name}\n")
+            f.write(f"  External IP: {external_ip}\n")
+            if depth == 0:
+                f.write(f"  Flask URL: http://{external_ip}:5000\n")
+            f.write(f"  Creation seconds: {seconds:.2f}\n")
+        f.write(f"Concurrency: {concurrency}\n")
+        f.write(f"Fan-out depth below this launcher: {depth}\n")
+        f.write(f"Makespan seconds: {makespan:.2f}\n")
+        f.write(f"Throughput: {throughput:.2f} VMs per minute\n")
+        f.write(f"Creation completed at: {time.strftime('%Y-%m-%d %H:%M:%S')}\n")
+
+    publish('created', len(timings))
+    publish('makespan', f"{makespan:.3f}")
+    publish('throughput', f"{throughput:.3f}")
+    for name, seconds in timings.items():
+        publish(f"vm-{name}", f"{seconds:.3f}")
+    log(f"Job complete in {time.monotonic() - start:.2f} seconds!")
+    if len(timings) + len(skipped) < count:
+        sys.exit(1)
+
+class LauncherService:
+    """Runs create and delete jobs from a queue on a fixed number of workers.
+
+    The Launcher, with its cached token, open connections and waiter, is
+    shared by every job, so a job costs only its own API calls. Each job
+    records how long it queued and how long it ran, and tags the VM it
+    creates with its own trace ID rather than the boot-time run's.
+    """
+
+    def __init__(self, launcher, concurrency):
+        self.launcher = launcher
+        self.concurrency = concurrency
+        self.queue = queue.Queue()
+        self.jobs = {}
+        self.finished = []
+        self.running = 0
+        self.lock = threading.Lock()
+        self.next_id = 1
+        for _ in range(concurrency):
+            threading.Thread(target=self.work, daemon=True).start()
+
+    def submit(self, action, name):
+        if action not in ('create', 'delete'):
+            raise ValueError(f"unknown action '{action}'")
+        if not isinstance(name, str) or not INSTANCE_NAME_PATTERN.fullmatch(name):
+            raise ValueError(f"invalid instance name {name!r}")
+        with self.lock:
+            job = {'id': self.next_id, 'action': action, 'name': name, 'status': 'queued',
+                   'trace_id': f"job-{self.next_id}-{os.urandom(4).hex()}",
+                   'submitted': time.time(), 'queued_seconds': None, 'run_seconds': None}
+            self.jobs[job['id']] = job
+            self.next_id += 1
+        self.queue.put(job)
+        return dict(job)
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            with self.lock:
+                self.running += 1
+                job['status'] = 'running'
+                job['queued_seconds'] = time.time() - job['submitted']
+            try:
+                if job['action'] == 'create':
+                    run_seconds = self.launcher.create(job['name'], trace_id=job['trace_id'])
+                else:
+                    run_seconds = self.launcher.delete(job['name'])
+                status, error = 'done', None
+            except Exception as e:
+                run_seconds, status, error = None, 'failed', str(e)
+            log(f"Job {job['id']} {job['action']} '{job['name']}' {status} "
+                f"after {job['queued_seconds']:.2f} s queued")
+            with self.lock:
+                job.update(status=status, run_seconds=run_seconds)
+                if error:
+                    job['error'] = error
+                self.running -= 1
+                self.finished.append(job)
+                # Forget the oldest finished jobs
+                for old in self.finished[:-SERVICE_HISTORY]:
+                    del self.jobs[old['id']]
+                self.finished = self.finished[-SERVICE_HISTORY:]
+
+    def job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def stats(self):
+        with self.lock:
+            done = [job for job in self.finished if job['status'] == 'done']
+            latencies = [job['queued_seconds'] + job['run_seconds'] for job in done]
+            return {
+                'queue_depth': self.queue.qsize(),
+                'running': self.running,
+                'concurrency': self.concurrency,
+                'done': len(done),
+                'failed': len(self.finished) - len(done),
+                'latency_p50': statistics.median(latencies) if latencies else None,
+                'latency_max': max(latencies) if latencies else None,
+                'operation_polls': self.launcher.waiter.polls,
+                'jobs': [dict(job) for job in self.finished[-20:]],
+            }
+
+def serve():
+    """Run the launcher service until the process is stopped."""
+    launcher = Launcher()
+    config = launcher.config
+    concurrency = int(config.get('SERVICE_CONCURRENCY', config.get('VM2_CONCURRENCY', 4)))
+    service = LauncherService(launcher, concurrency)
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def reply(self, status, body):
+            payload = json.dumps(body, indent=2).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self.reply(200, service.stats())
+            elif self.path.startswith('/jobs/') and self.path[6:].isdigit():
+                job = service.job(int(self.path[6:]))
+                self.reply(200 if job else 404, job or {'error': 'no such job'})
+            else:
+                self.reply(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/jobs':
+                self.reply(404, {'error': 'not found'})
+                return
+            try:
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if not isinstance(request, dict):
+                    raise ValueError("request body must be a JSON object")
+                self.reply(202, service.submit(request.get('action'), request['name']))
+            except (ValueError, KeyError) as e:
+                self.reply(400, {'error': str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    address = config.get('SERVICE_ADDRESS', SERVICE_ADDRESS)
+    port = int(config.get('SERVICE_PORT', SERVICE_PORT))
+    server = http.server.ThreadingHTTPServer((address, port), Handler)
+    log(f"Launcher service listening on {address}:{port}, {concurrency} jobs at a time")
+    server.serve_forever()
+
+def service_call(path, body=None):
+    """Call the launcher service on this VM."""
+    config = read_config(os.path.join(SRV_DIR, 'config.txt'))
+    address = config.get('SERVICE_ADDRESS', SERVICE_ADDRESS)
+    if address == '0.0.0.0':
+        address = '127.0.0.1'
+    request = urllib.request.Request(
+        f"http://{address}:{config.get('SERVICE_PORT', SERVICE_PORT)}{path}",
+        data=json.dumps(body).encode() if body is not None else None,
+        headers={'Content-Type': 'application/json'}
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.load(response)
+
+def main():
+    parser = argparse.ArgumentParser(description="Create VMs from VM-1")
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('serve', help="run the launcher service")
+    submit = commands.add_parser('submit', help="queue a job with the launcher service")
+    submit.add_argument('action', choices=['create', 'delete'])
+    submit.add_argument('name')
+    submit.add_argument('--wait', action='store_true', help="wait for the job to finish")
+    commands.add_parser('stats', help="print the launcher service's queue depth and job latencies")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve()
+    elif args.command == 'submit':
+        job = service_call('/jobs', {'action': args.action, 'name': args.name})
+        while args.wait and job['status'] in ('queued', 'running'):
+            time.sleep(1)
+            job = service_call(f"/jobs/{job['id']}")
+        print(json.dumps(job, indent=2))
+    elif args.command == 'stats':
+        print(json.dumps(service_call('/stats'), indent=2))
+    else:
+        run_once()
+
+if __name__ == "__main__":
+    main()